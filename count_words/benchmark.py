@@ -0,0 +1,210 @@
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+import re
+import resource
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+import normalizer
+import tokenizer
+from cleaner import Cleaner
+from counter import WordCounter
+from merger import read_pdf_text
+from stop_words import StopWords
+
+chunk_size = 1 << 20
+
+
+def synthetic_words(vocabulary, seed=0):
+    """random words with a zipfian frequency, like the words of natural text"""
+    rng = random.Random(seed)
+    cumulative = []
+    total = 0.0
+    for rank in range(1, vocabulary + 1):
+        total += 1.0 / rank
+        cumulative.append(total)
+    words = []
+    for _ in range(vocabulary):
+        length = rng.randint(1, 12)
+        words.append(
+            "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+        )
+    while True:
+        yield from rng.choices(words, cum_weights=cumulative, k=4096)
+
+
+def write_corpus(path, size_mb, vocabulary, seed=0):
+    """write size_mb of text: mixed case words, punctuation, digits and line breaks"""
+    rng = random.Random(seed)
+    words = synthetic_words(vocabulary, seed)
+    remaining = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf8") as f:
+        while remaining > 0:
+            line = []
+            for _ in range(12):
+                word = next(words)
+                roll = rng.random()
+                if roll < 0.05:
+                    word = word.capitalize()
+                elif roll < 0.1:
+                    word += rng.choice(".,;:?!")
+                elif roll < 0.12:
+                    word = str(rng.randint(1, 2024))
+                line.append(word)
+            text = " ".join(line) + "\n"
+            f.write(text)
+            remaining -= len(text)
+
+
+def write_pdf(path, corpus_path, pages):
+    with open(corpus_path, "r", encoding="utf8") as f:
+        lines = [f.readline() for _ in range(pages * 40)]
+    with fitz.open() as pdf_document:
+        for start in range(0, len(lines), 40):
+            page = pdf_document.new_page()
+            page.insert_text((40, 40), "".join(lines[start : start + 40]), fontsize=8)
+        pdf_document.save(path)
+
+
+def read_chunks(path):
+    with open(path, "r", encoding="utf8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            # do not cut a word in two
+            chunk += f.readline()
+            yield chunk
+
+
+# -------- stages, each run in a fresh process so its peak RSS is its own --------
+
+
+def stage_extract(args):
+    return len(read_pdf_text(args.pdf_path))
+
+
+def stage_read(args):
+    return sum(len(chunk) for chunk in read_chunks(args.corpus))
+
+
+def stage_legacy(args):
+    # the former main.py: whole corpus as one string, Cleaner, then findall
+    with open(args.corpus, "r", encoding="utf8") as f:
+        text = " ".join(f.readlines())
+    return Counter(re.findall(r"\b\w+\b", Cleaner(text).clean()))
+
+
+def stage_clean(args):
+    return sum(len(Cleaner(chunk).clean()) for chunk in read_chunks(args.corpus))
+
+
+def stage_tokenize(args):
+    word_count = Counter()
+    for chunk in read_chunks(args.corpus):
+        word_count.update(tokenizer.tokenize(chunk))
+    return word_count
+
+
+def stage_normalize(args):
+    word_count = stage_tokenize(args)
+    start = time.perf_counter()
+    normalizer.fold_counts(word_count)
+    return time.perf_counter() - start, normalizer.report()
+
+
+def stage_summarize(args):
+    word_count = stage_tokenize(args)
+    start = time.perf_counter()
+    WordCounter.summarize(
+        word_count, StopWords.load(WordCounter.stop_words_path), args.top
+    )
+    return time.perf_counter() - start, None
+
+
+stages = {
+    "extract": stage_extract,
+    "read": stage_read,
+    "legacy": stage_legacy,
+    "clean": stage_clean,
+    "tokenize": stage_tokenize,
+    "normalize": stage_normalize,
+    "summarize": stage_summarize,
+}
+
+# stages that first rebuild their input and only time their own part
+self_timed = {"normalize", "summarize"}
+
+
+def run_stage(name, args):
+    start = time.perf_counter()
+    result = stages[name](args)
+    elapsed = time.perf_counter() - start
+    if name in self_timed:
+        elapsed, result = result
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return elapsed, peak_rss, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the count_words stages")
+    parser.add_argument("--size", type=int, default=8, help="synthetic corpus in MB")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--corpus", help="use this text file instead of a synthetic one"
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(stages),
+        default=["read", "legacy", "clean", "tokenize", "normalize", "summarize"],
+    )
+    parser.add_argument(
+        "--pdf-pages", type=int, default=200, help="pages of the extract pdf"
+    )
+    parser.add_argument("--top", type=int)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.corpus is None:
+            args.corpus = os.path.join(tmp_dir, "corpus.txt")
+            start = time.perf_counter()
+            write_corpus(args.corpus, args.size, args.vocabulary, args.seed)
+            print(f"generated corpus in {time.perf_counter() - start:.2f} s")
+        if "extract" in args.stages:
+            args.pdf_path = os.path.join(tmp_dir, "corpus.pdf")
+            write_pdf(args.pdf_path, args.corpus, args.pdf_pages)
+        print(f"corpus: {os.path.getsize(args.corpus) / 1024 / 1024:.2f} MB")
+
+        print(f"{'stage':<10} {'seconds':>9} {'MB/s':>9} {'peak RSS MB':>12}")
+        size_mb = os.path.getsize(args.corpus) / 1024 / 1024
+        results = {}
+        for name in args.stages:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                elapsed, peak_rss, result = executor.submit(
+                    run_stage, name, args
+                ).result()
+            results[name] = result
+            throughput = (
+                "" if name in self_timed | {"extract"} else f"{size_mb / elapsed:9.1f}"
+            )
+            print(f"{name:<10} {elapsed:9.3f} {throughput:>9} {peak_rss:12.1f}")
+            if name == "normalize":
+                print(f"           {result}")
+
+        if "legacy" in results and "tokenize" in results:
+            if results["legacy"] != results["tokenize"]:
+                raise SystemExit(
+                    "the tokenizer counts differ from Cleaner + WordCounter"
+                )
+            print("tokenizer counts match Cleaner + WordCounter")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from collections import Counter
+import hashlib
+import json
+import os
+
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CountCache:
+    """partial word counts of every pdf, keyed by content hash and persisted as json
+
+    a file whose size and mtime did not change is trusted without hashing it again,
+    a renamed or copied paper is found by its hash and not counted twice.
+    """
+
+    cache_path = "out/cache.json"
+
+    def __init__(self, path=cache_path):
+        self.path = path
+        self.files = {}  # file path -> {"sha256", "mtime", "size"}
+        self.counts = {}  # sha256 -> raw word counts
+        self.total = Counter()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf8") as f:
+                data = json.load(f)
+            self.files = data["files"]
+            self.counts = data["counts"]
+            self.total = Counter(data["total"])
+
+    def lookup(self, file_path):
+        """return the file hash and its cached counts, the counts are None on a miss"""
+        stat = os.stat(file_path)
+        entry = self.files.get(file_path)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            digest = entry["sha256"]
+        else:
+            digest = file_hash(file_path)
+        counts = self.counts.get(digest)
+        if counts is None:
+            return digest, None
+        self._track(file_path, digest, stat)
+        return digest, Counter(counts)
+
+    def store(self, file_path, digest, counts):
+        self.counts[digest] = dict(counts)
+        self._track(file_path, digest, os.stat(file_path))
+
+    def _track(self, file_path, digest, stat):
+        entry = self.files.get(file_path)
+        if entry is None or entry["sha256"] != digest:
+            if entry is not None:
+                self.total.subtract(self.counts.get(entry["sha256"], {}))
+            self.total.update(self.counts[digest])
+        self.files[file_path] = {
+            "sha256": digest,
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+
+    def prune(self, file_paths):
+        """forget every file not in file_paths, and the counts nobody refers to"""
+        keep = set(file_paths)
+        for file_path in list(self.files):
+            if file_path not in keep:
+                entry = self.files.pop(file_path)
+                self.total.subtract(self.counts.get(entry["sha256"], {}))
+        used = {entry["sha256"] for entry in self.files.values()}
+        self.counts = {digest: c for digest, c in self.counts.items() if digest in used}
+        self.total = +self.total
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(
+                {"files": self.files, "counts": self.counts, "total": self.total},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
@@ -1,25 +1,66 @@
-from collections import Counter
+from collections import Counter, deque
+import heapq
+from operator import itemgetter
 import re
 
+from stop_words import StopWords
+
 
 class WordCounter:
     stop_words_path = "stop_words.txt"
 
-    def count_words(text):
-        words = re.findall(r"\b\w+\b", text)
-        word_count = Counter(words)
+    def count_words(text, stop_words=None):
+        return WordCounter.count_tokens(re.findall(r"\b\w+\b", text), stop_words)
+
+    def count_tokens(tokens, stop_words=None, top=None):
+        return WordCounter.summarize(Counter(tokens), stop_words, top)
+
+    def summarize(word_count, stop_words=None, top=None):
         word_count = WordCounter.filter_short_words(word_count)
-        # load stop words
-        with open(WordCounter.stop_words_path, "r", encoding="utf8") as f:
-            lines = f.readlines()
-            stop_words_text = " ".join(lines)
-            stop_words = re.findall(r"\b\w+\b", stop_words_text)
+        if stop_words is None:
+            stop_words = StopWords.load(WordCounter.stop_words_path)
         word_count = WordCounter.filter_stop_words(word_count, stop_words)
+        return WordCounter.rank(word_count, top)
+
+    def rank(word_count, top=None):
+        if top is not None:
+            return WordCounter.top_words(word_count, top)
         sorted_word_count = dict(
             sorted(word_count.items(), key=lambda item: item[1], reverse=True)
         )
         return sorted_word_count
 
+    def top_words(word_count, k):
+        """the k most frequent words, selected with a heap instead of a full sort"""
+        return dict(heapq.nlargest(k, word_count.items(), key=itemgetter(1)))
+
+    def merge_counts(counters):
+        """merge partial counts pairwise (tree reduction), the inputs are left untouched"""
+        level = list(counters)
+        if not level:
+            return Counter()
+        if len(level) == 1:
+            return Counter(level[0])
+        while len(level) > 1:
+            merged = [level[i] + level[i + 1] for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                merged.append(level[-1])
+            level = merged
+        return level[0]
+
+    def ngrams(tokens, n, stop_words=()):
+        """yield the n-grams as space separated strings
+
+        an n-gram is skipped when one of its words would be filtered out as a unigram.
+        """
+        window = deque(maxlen=n)
+        for token in tokens:
+            window.append(token)
+            if len(window) == n and all(
+                len(word) >= 3 and word not in stop_words for word in window
+            ):
+                yield " ".join(window)
+
     def filter_short_words(word_count):
         return {word: count for word, count in word_count.items() if len(word) >= 3}
 
@@ -27,3 +68,49 @@ class WordCounter:
         return {
             word: count for word, count in word_count.items() if word not in stop_words
         }
+
+
+class SpaceSaving:
+    """approximate counts of the most frequent items, with at most capacity counters
+
+    Space-Saving (Metwally et al.): when the table is full a new item takes over the
+    counter of the least frequent one, inheriting its count as possible error. every
+    item more frequent than total / capacity is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # one (count, item) entry per monitored item, the count may be stale (too low)
+        self.heap = []
+
+    def add(self, item):
+        if item in self.counts:
+            self.counts[item] += 1
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            self.errors[item] = 0
+            heapq.heappush(self.heap, (1, item))
+            return
+        while True:
+            count, victim = self.heap[0]
+            if self.counts[victim] == count:
+                break
+            heapq.heapreplace(self.heap, (self.counts[victim], victim))
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[item] = count + 1
+        self.errors[item] = count
+        heapq.heapreplace(self.heap, (count + 1, item))
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def most_common(self, k=None):
+        """(item, count) pairs, the counts overestimate by at most errors[item]"""
+        if k is None:
+            return sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
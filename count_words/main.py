@@ -1,33 +1,143 @@
+import argparse
+from collections import Counter
 import os
 
-from cleaner import Cleaner
+import pipeline
+from cache import CountCache
+import normalizer
+import profiling
 from merger import Merger
 from counter import WordCounter
+from stop_words import StopWords
+import writer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="count words of exam papers")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes used to extract and count the pdfs",
+    )
+    parser.add_argument(
+        "--keep-intermediate",
+        action="store_true",
+        help="also write the merged text and the cleaned text into out/",
+    )
+    parser.add_argument(
+        "--per-document",
+        action="store_true",
+        help="also write the word statistics of every pdf into out/per_document/",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"recount every pdf instead of reusing {CountCache.cache_path}",
+    )
+    parser.add_argument(
+        "--stop-words",
+        nargs="+",
+        default=[WordCounter.stop_words_path],
+        metavar="PATH",
+        help="one or more stop word lists",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        metavar="K",
+        help="only output the K most frequent words",
+    )
+    parser.add_argument(
+        "--format",
+        choices=writer.formats,
+        default="txt",
+        help="format of the word statistics, written to out/result.<format>",
+    )
+    parser.add_argument(
+        "--ngram",
+        type=int,
+        default=1,
+        metavar="N",
+        help="count sequences of N words (bigrams, trigrams, ...) instead of words",
+    )
+    parser.add_argument(
+        "--approx",
+        type=int,
+        metavar="CAPACITY",
+        help="approximate the n-gram counts keeping at most CAPACITY of them in memory",
+    )
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="fold inflections before counting (runs, running -> run)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="run under cProfile, print the hot spots and save the stats to PATH",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="trace memory allocations and print the peak and the largest sites",
+    )
+    args = parser.parse_args()
+    if args.keep_intermediate and args.per_document:
+        parser.error("--per-document can not be combined with --keep-intermediate")
+    if args.ngram > 1 and (args.keep_intermediate or args.per_document):
+        parser.error(
+            "--ngram can not be combined with --keep-intermediate or --per-document"
+        )
+    if args.approx is not None and args.ngram <= 1:
+        parser.error("--approx requires --ngram")
+    return args
 
 
 def main():
-    # merge pdf, output the merged text
-    Merger("pdf").merge()
-    with open(Merger.origin_path, "r", encoding="utf8") as f:
-        lines = f.readlines()
-        pdf_text = " ".join(lines)
-    print("=== merge text completed.")
-
-    # remove invalid characteristics
-    cleaned_text = Cleaner(pdf_text).clean()
-    with open("out/final.txt", "w", encoding="utf8") as f:
-        f.write(cleaned_text)
-    print("=== remove invalid characteristics completed.")
-
-    # count words
-    sorted_word_count = WordCounter.count_words(cleaned_text)
+    args = parse_args()
+    with profiling.profiled(args.profile, args.tracemalloc):
+        run(args)
+
+
+def run(args):
+    fold = normalizer.fold_counts if args.normalize else (lambda word_count: word_count)
+
+    stop_words = StopWords.load(*args.stop_words)
+    merger = Merger("pdf", workers=args.workers)
+    if args.ngram > 1:
+        ngram_count = pipeline.count_ngrams(
+            merger.list_pdfs(), args.ngram, stop_words, args.workers, args.approx
+        )
+        sorted_word_count = WordCounter.rank(fold(ngram_count), args.top)
+    elif args.keep_intermediate:
+        # extract -> clean -> tokenize -> count, one page at a time
+        chunks = pipeline.write_through(merger.chunks(), Merger.origin_path)
+        cleaned = pipeline.write_through(pipeline.clean(chunks), "out/final.txt")
+        word_count = fold(Counter(pipeline.tokenize(cleaned)))
+        sorted_word_count = WordCounter.summarize(word_count, stop_words, args.top)
+    else:
+        # count every new or changed pdf on its own, then merge the partial counts
+        cache = None if args.no_cache else CountCache()
+        per_document, total = pipeline.count_corpus(
+            merger.list_pdfs(), args.workers, cache
+        )
+        sorted_word_count = WordCounter.summarize(fold(total), stop_words, args.top)
+        if args.per_document:
+            os.makedirs("out/per_document", exist_ok=True)
+            for file_path, word_count in per_document.items():
+                name = os.path.splitext(os.path.basename(file_path))[0]
+                writer.write_counts(
+                    f"out/per_document/{name}.{args.format}",
+                    WordCounter.summarize(fold(word_count), stop_words, args.top),
+                    args.format,
+                )
+    print("=== count words completed.")
+    if args.normalize:
+        print(normalizer.report())
 
     # output the word statistics
-    if os.path.exists("out/result.txt"):
-        os.remove("out/result.txt")
-    with open("out/result.txt", "a+", encoding="utf8") as f:
-        for word, count in sorted_word_count.items():
-            f.write(f"{word}: {count}\n")
+    writer.write_counts(f"out/result.{args.format}", sorted_word_count, args.format)
     print("=== all completed.")
 
 
@@ -1,25 +1,56 @@
 import fitz  # PyMuPDF
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def read_pdf_text(file_path):
+    # collect pages and join once, repeated `+=` is quadratic on large documents
+    with fitz.open(file_path) as pdf_document:
+        return "".join(read_pdf_pages(pdf_document))
+
+
+def read_pdf_pages(pdf_document):
+    for page in pdf_document:
+        yield page.get_text()
 
 
 class Merger:
     origin_path = "out/origin.txt"
 
-    def __init__(self, path):
+    def __init__(self, path, workers=1):
         self.path = path
+        self.workers = workers
+
+    def list_pdfs(self):
+        # sorted so the merged output does not depend on directory order
+        return [os.path.join(self.path, item) for item in sorted(os.listdir(self.path))]
+
+    def extract(self):
+        """yield (file_path, text) for every pdf, in list_pdfs order"""
+        files = self.list_pdfs()
+        if self.workers <= 1:
+            for file_path in files:
+                yield file_path, read_pdf_text(file_path)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # map keeps the input order, so the output is the same as a serial run
+            yield from zip(files, executor.map(read_pdf_text, files))
+
+    def chunks(self):
+        """yield the text page by page, or document by document when using workers"""
+        if self.workers > 1:
+            for _, text in self.extract():
+                yield text
+            return
+        for file_path in self.list_pdfs():
+            with fitz.open(file_path) as pdf_document:
+                yield from read_pdf_pages(pdf_document)
 
     def merge(self):
-        if os.path.exists(self.origin_path):
-            os.remove(self.origin_path)
-        files = os.listdir(self.path)
-        for item in files:
-            self.read_pdf(os.path.join(self.path, item))
+        with open(self.origin_path, "w", encoding="utf8") as f:
+            for _, text in self.extract():
+                f.write(text)
 
     def read_pdf(self, file_path):
-        text = ""
-        with fitz.open(file_path) as pdf_document:
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                text += page.get_text()
         with open(self.origin_path, "a+", encoding="utf8") as f:
-            f.write(text)
+            f.write(read_pdf_text(file_path))
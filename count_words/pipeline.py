@@ -0,0 +1,106 @@
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import fitz  # PyMuPDF
+
+from cleaner import Cleaner
+from counter import SpaceSaving, WordCounter
+import tokenizer
+from merger import read_pdf_pages
+
+word_pattern = re.compile(r"\b\w+\b")
+
+
+def clean(chunks):
+    for chunk in chunks:
+        yield Cleaner(chunk).clean()
+
+
+def tokenize(chunks):
+    for chunk in chunks:
+        for match in word_pattern.finditer(chunk):
+            yield match.group()
+
+
+def words(chunks):
+    """clean and tokenize in one pass, see tokenizer.tokenize"""
+    for chunk in chunks:
+        yield from tokenizer.tokenize(chunk)
+
+
+def write_through(chunks, path):
+    """pass chunks on unchanged while saving them to path"""
+    with open(path, "w", encoding="utf8") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            yield chunk
+
+
+def document_words(file_path):
+    with fitz.open(file_path) as pdf_document:
+        yield from words(read_pdf_pages(pdf_document))
+
+
+def count_pdf(file_path):
+    """raw token counts of one pdf, the partial result of a map-reduce count"""
+    return Counter(document_words(file_path))
+
+
+def count_pdf_ngrams(file_path, n, stop_words=()):
+    return Counter(WordCounter.ngrams(document_words(file_path), n, stop_words))
+
+
+def count_ngrams(files, n, stop_words=(), workers=1, capacity=None):
+    """n-gram counts over all pdfs, n-grams never span two documents
+
+    with a capacity the counts are approximated by a SpaceSaving summary of at most
+    that many n-grams, instead of an exact Counter of every n-gram seen.
+    """
+    if capacity is not None:
+        summary = SpaceSaving(capacity)
+        for file_path in files:
+            summary.update(WordCounter.ngrams(document_words(file_path), n, stop_words))
+        return dict(summary.most_common())
+    count = partial(count_pdf_ngrams, n=n, stop_words=stop_words)
+    if workers <= 1:
+        return WordCounter.merge_counts(map(count, files))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return WordCounter.merge_counts(executor.map(count, files))
+
+
+def count_corpus(files, workers=1, cache=None):
+    """return the per-document counts and their merged total
+
+    with a CountCache only the new or changed pdfs are extracted and counted.
+    """
+    per_document = {}
+    digests = {}
+    missing = []
+    for file_path in files:
+        if cache is None:
+            missing.append(file_path)
+            continue
+        digests[file_path], counts = cache.lookup(file_path)
+        if counts is None:
+            missing.append(file_path)
+        else:
+            per_document[file_path] = counts
+
+    if workers <= 1 or len(missing) <= 1:
+        counted = [count_pdf(file_path) for file_path in missing]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counted = list(executor.map(count_pdf, missing))
+    for file_path, counts in zip(missing, counted):
+        per_document[file_path] = counts
+        if cache is not None:
+            cache.store(file_path, digests[file_path], counts)
+
+    per_document = {file_path: per_document[file_path] for file_path in files}
+    if cache is None:
+        return per_document, WordCounter.merge_counts(per_document.values())
+    cache.prune(files)
+    cache.save()
+    return per_document, Counter(cache.total)
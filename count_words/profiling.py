@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+import cProfile
+import pstats
+import tracemalloc
+
+
+@contextmanager
+def profiled(profile_path=None, trace_memory=False, limit=20):
+    """profile the enclosed block with cProfile and/or tracemalloc
+
+    only the current process is observed, run with --workers 1 to see the
+    extraction and counting work.
+    """
+    profile = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profile:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile:
+            profile.disable()
+            profile.dump_stats(profile_path)
+            pstats.Stats(profile).sort_stats("cumulative").print_stats(limit)
+            print(f"=== profile saved to {profile_path}")
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"=== peak traced memory: {peak / 1024 / 1024:.2f} MB")
+            for stat in snapshot.statistics("lineno")[:limit]:
+                print(stat)
@@ -0,0 +1,26 @@
+from functools import lru_cache
+import re
+
+
+class StopWords:
+    """an immutable set of stop words, cheap to test and to pickle into workers"""
+
+    def __init__(self, words):
+        self.words = frozenset(word.lower() for word in words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def load(*paths):
+        """read the stop lists once per process, the same paths return the same object"""
+        words = set()
+        for path in paths:
+            with open(path, "r", encoding="utf8") as f:
+                for line in f:
+                    words.update(re.findall(r"\b\w+\b", line))
+        return StopWords(words)
@@ -0,0 +1,27 @@
+import csv
+import io
+import json
+
+formats = ("txt", "tsv", "csv", "json")
+
+
+def dumps(word_count, fmt="txt"):
+    if fmt == "txt":
+        return "".join(f"{word}: {count}\n" for word, count in word_count.items())
+    if fmt == "tsv":
+        return "".join(f"{word}\t{count}\n" for word, count in word_count.items())
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["word", "count"])
+        writer.writerows(word_count.items())
+        return buffer.getvalue()
+    if fmt == "json":
+        return json.dumps(word_count, ensure_ascii=False, indent=0)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def write_counts(path, word_count, fmt="txt"):
+    """serialize the whole statistics first and write them with a single call"""
+    with open(path, "w", encoding="utf8") as f:
+        f.write(dumps(word_count, fmt))
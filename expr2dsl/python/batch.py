@@ -0,0 +1,85 @@
+"""批量把查询编译为 DSL：JSONL 输入，JSONL 输出
+
+    python batch.py queries.jsonl -o dsl.jsonl --workers 8 --fields title keywords abstract
+    python batch.py long_queries.jsonl --inline
+
+输入每行是 {"id": ..., "query": "..."} 或一个 JSON 字符串，缺少 id 时使用行号；
+输出每行是 {"id": ..., "dsl": {...}}，解析失败时为 {"id": ..., "error": "..."}，不会中断整个批次。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import sys
+
+from main import QueryParser
+import batch_io
+
+
+_worker_parser = None
+
+
+def _init_worker(default_fields, inline=False):
+
+    global _worker_parser
+    _worker_parser = QueryParser(default_fields, inline=inline)
+
+
+def _parse_one(query):
+
+    try:
+        return {"dsl": _worker_parser.parse(query)}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _parse_chunk(queries):
+
+    return [_parse_one(query) for query in queries]
+
+
+def parse_many(
+    queries, default_fields=None, workers=1, chunk_size=256, window=64, inline=False
+):
+    """按输入顺序逐个产出 {"dsl": ...} 或 {"error": ...}"""
+
+    if workers <= 1:
+        _init_worker(default_fields, inline)
+        for query in queries:
+            yield _parse_one(query)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(default_fields, inline),
+    ) as executor:
+        yield from batch_io.bounded_map(executor, _parse_chunk, queries, chunk_size, window)
+
+
+def run_batch(lines, output, default_fields=None, workers=1, inline=False):
+
+    return batch_io.run_batch(
+        lines,
+        output,
+        lambda queries: parse_many(queries, default_fields, workers, inline=inline),
+    )
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description="批量把查询编译为 Elasticsearch DSL")
+    arg_parser.add_argument("input", help="JSONL 文件，- 表示标准输入")
+    arg_parser.add_argument("-o", "--output", default="-", help="JSONL 文件，- 表示标准输出")
+    arg_parser.add_argument("--workers", type=int, default=1)
+    arg_parser.add_argument("--fields", nargs="+", help="默认检索字段")
+    arg_parser.add_argument("--inline", action="store_true", help="解析时直接构建 AST，适合很长的查询")
+    args = arg_parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    with source, target:
+        total, failed = run_batch(
+            source, target, args.fields, args.workers, args.inline
+        )
+
+    print(f"done: {total} queries, {failed} failed", file=sys.stderr)
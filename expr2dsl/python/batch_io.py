@@ -0,0 +1,71 @@
+"""expr2dsl 与 re_parser 的 batch.py 共用的 JSONL 读写与有界并行调度
+
+re_parser 以 expr2dsl.batch_io 的包名导入本模块（见 re_parser/expr2dsl.py），两个项目的 batch.py 只保留各自的解析部分。
+"""
+
+from collections import deque
+from itertools import islice
+import json
+
+
+def bounded_map(executor, func, items, chunk_size, window):
+
+    # 每个任务处理 chunk_size 个查询以摊薄进程间通信的开销；
+    # 最多同时提交 window 个任务，按输入顺序产出结果，内存占用与输入规模无关
+    items = iter(items)
+    pending = deque()
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if chunk:
+            pending.append(executor.submit(func, chunk))
+        if pending and (not chunk or len(pending) >= window):
+            yield from pending.popleft().result()
+        if not chunk and not pending:
+            return
+
+
+def read_records(lines):
+
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = {"error": f"JSONDecodeError: {e}"}
+        if isinstance(record, str):
+            record = {"query": record}
+        if not isinstance(record, dict):
+            record = {"error": "expected a JSON object or string"}
+        elif "query" not in record and "error" not in record:
+            record = {"id": record.get("id", line_no), "error": "missing 'query'"}
+        elif "error" not in record and not isinstance(record["query"], str):
+            # 否则数字、null 等会一直传到解析器，报出难以理解的错误
+            record = {"id": record.get("id", line_no), "error": "'query' must be a string"}
+        record.setdefault("id", line_no)
+        yield record
+
+
+def run_batch(lines, output, parse_many):
+    """parse_many 接收查询的迭代器，按相同顺序产出 {"dsl": ...} 或 {"error": ...}"""
+
+    total = failed = 0
+    records = deque()
+
+    def queries():
+        # 无效的输入行也占一个位置，保证输出顺序与输入一致
+        for record in read_records(lines):
+            records.append(record)
+            yield record.get("query", "")
+
+    for result in parse_many(queries()):
+        record = records.popleft()
+        if "error" in record:
+            result = {"error": record["error"]}
+        total += 1
+        failed += "error" in result
+        output.write(json.dumps({"id": record["id"], **result}, ensure_ascii=False))
+        output.write("\n")
+
+    return total, failed
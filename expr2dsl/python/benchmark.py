@@ -0,0 +1,159 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+from fuzz import random_query
+from legacy import LegacyQueryTransformer
+from main import QueryParser, QueryTransformer, build_parser
+from query_cache import QueryCache
+
+
+def nested_field_query(depth, width):
+
+    # F0:(w AND ... AND F1:(w AND ... AND F2:(...)))，每层 width 个词
+    query = " OR ".join(f"leaf{i}" for i in range(width))
+    for level in reversed(range(depth)):
+        words = " AND ".join(f"w{level}_{i}" for i in range(width))
+        query = f"F{level}:({words} AND ({query}))"
+    return query
+
+
+def synonym_query(groups, synonyms):
+
+    # 与 main.py 中燃料电池的例子同一形态：每组 synonyms 个 OR 在一起的短语，组之间 AND
+    return " AND ".join(
+        "(" + " OR ".join(f'"g{g}同义词{i}"' for i in range(synonyms)) + ")"
+        for g in range(groups)
+    ) + " AND IPC:(H01M8 OR H01M4) AND APD:[20200101 TO 20251231]"
+
+
+def peak_memory(parser, query):
+
+    # 解析过程中 Python 对象的峰值内存（字节）与耗时
+    tracemalloc.start()
+    start = time.perf_counter()
+    dsl = parser.parse(query)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dsl, peak, elapsed
+
+
+def best_time(transformer_class, tree, rounds):
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        transformer_class(["title", "keywords"]).transform(tree)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def latencies(parser, queries):
+
+    # 逐个查询计时，返回升序的耗时列表（秒）
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        parser.parse(query)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def percentile(times, q):
+
+    return times[min(len(times) - 1, int(q * len(times)))]
+
+
+def fields_suite(args):
+
+    parser = build_parser()
+
+    print(f"{'depth':>6} {'nodes':>7} {'legacy ms':>10} {'top-down ms':>12} {'speedup':>8}")
+    for depth in args.depths:
+        tree = parser.parse(nested_field_query(depth, args.width))
+        top_down = best_time(QueryTransformer, tree, args.rounds)
+        nodes = depth * (args.width + 1) + args.width
+        try:
+            legacy = best_time(LegacyQueryTransformer, tree, args.rounds)
+        except RecursionError:
+            # 原来的 Transformer 逐层递归，在默认的递归深度下无法转换这么深的树
+            print(f"{depth:>6} {nodes:>7} {'recursion':>10} {top_down * 1000:>12.2f} {'-':>8}")
+            continue
+        print(f"{depth:>6} {nodes:>7} {legacy * 1000:>10.2f} "
+              f"{top_down * 1000:>12.2f} {legacy / top_down:>7.1f}x")
+
+
+def memory_suite(args):
+
+    print(f"{'synonyms':>8} {'KB':>7} {'two-phase MB':>13} {'inline MB':>10} "
+          f"{'two-phase ms':>13} {'inline ms':>10}")
+    two_phase, inline = QueryParser(), QueryParser(inline=True)
+    for synonyms in args.synonyms:
+        query = synonym_query(args.groups, synonyms)
+        inline.parse(query)  # 预先生成解析表，不计入测量
+        expected, peak_two, time_two = peak_memory(two_phase, query)
+        dsl, peak_inline, time_inline = peak_memory(inline, query)
+        assert dsl == expected
+        print(f"{synonyms:>8} {len(query.encode()) / 1024:>7.1f} "
+              f"{peak_two / 2**20:>13.2f} {peak_inline / 2**20:>10.2f} "
+              f"{time_two * 1000:>13.2f} {time_inline * 1000:>10.2f}")
+
+
+def throughput_suite(args):
+
+    # fuzz.py 生成的随机查询；每种形态下各条路径的 qps 与 p50 / p99 延迟，
+    # 并确认 inline 与缓存路径的 DSL 与两阶段完全相同（语义上的交叉检查见 fuzz.py）
+    paths = {
+        "two-phase": QueryParser(),
+        "inline": QueryParser(inline=True),
+        "optimized": QueryParser(optimized=True),
+        "cached": QueryParser(cache=QueryCache(maxsize=2 * args.queries)),
+    }
+
+    print(f"{'depth':>5} {'width':>5} {'path':>10} {'qps':>9} {'p50 us':>9} {'p99 us':>9}")
+    for depth in args.fuzz_depths:
+        rng = random.Random(depth)
+        queries = [random_query(rng, depth, args.fuzz_width) for _ in range(args.queries)]
+        for query in queries:
+            expected = paths["two-phase"].parse(query)
+            if paths["inline"].parse(query) != expected:
+                raise SystemExit(f"inline parse differs: {query}")
+            if paths["cached"].parse(query) != expected:
+                raise SystemExit(f"cached parse differs: {query}")
+
+        for name, parser in paths.items():
+            times = latencies(parser, queries)
+            print(f"{depth:>5} {args.fuzz_width:>5} {name:>10} {len(times) / sum(times):>9.0f} "
+                  f"{percentile(times, 0.5) * 1e6:>9.1f} {percentile(times, 0.99) * 1e6:>9.1f}")
+
+
+SUITES = {
+    "fields": fields_suite,
+    "memory": memory_suite,
+    "throughput": throughput_suite,
+}
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description="QueryParser 的性能测试")
+    arg_parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    # fields：嵌套字段作用域的转换耗时
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[10, 50, 100, 200])
+    arg_parser.add_argument("--width", type=int, default=5)
+    arg_parser.add_argument("--rounds", type=int, default=3)
+    # memory：长同义词查询的峰值内存
+    arg_parser.add_argument("--synonyms", type=int, nargs="+", default=[50, 200, 1000])
+    arg_parser.add_argument("--groups", type=int, default=4)
+    # throughput：随机查询的吞吐与延迟（缓存路径测的是命中后的耗时）
+    arg_parser.add_argument("--fuzz-depths", type=int, nargs="+", default=[2, 4, 6])
+    arg_parser.add_argument("--fuzz-width", type=int, default=4)
+    arg_parser.add_argument("--queries", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    for i, suite in enumerate(args.suites):
+        if i:
+            print()
+        SUITES[suite](args)
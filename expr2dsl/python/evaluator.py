@@ -0,0 +1,409 @@
+"""在内存中的文档上执行查询，用于请求 Elasticsearch 前的预过滤和离线测试
+
+    parser = QueryParser(["title", "keywords"])
+    node = parser.parse_ast('"燃料电池" AND APD:[20200101 TO 20251231]')
+
+    # 逐个文档判断
+    predicate = compile_predicate(node, parser.default_fields)
+    hits = [doc for doc in docs if predicate(doc)]
+
+    # 倒排索引 + NumPy 布尔掩码，建一次索引后每个查询只做数组运算
+    index = DocumentIndex.from_documents(docs)
+    ids = index.search(node, parser.default_fields)
+
+文档是 dict，字段值可以是字符串、数字或字符串列表（多值字段）。
+匹配规则近似 Elasticsearch 的 standard 分词：小写，按非词字符切分，中日韩文字逐字切分；
+multi_match 的任一词在任一字段中出现即匹配，短语要求各词连续出现，
+term 要求字段值完全相等，range 两端都是数字时按数值比较，否则按字符串比较。
+"""
+
+from itertools import accumulate
+from time import perf_counter
+import random
+import re
+
+try:
+    import numpy as np
+except ImportError:  # 只有 DocumentIndex 需要 numpy
+    np = None
+
+try:
+    # re_parser 以 expr2dsl.evaluator 的包名导入本模块
+    from .query_ast import Backend, Range
+except ImportError:
+    from query_ast import Backend, Range
+
+
+_TOKEN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]|[^\W\u3400-\u9fff\uf900-\ufaff]+")
+
+
+def analyze(value):
+
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [token for item in value for token in analyze(item)]
+    return _TOKEN.findall(str(value).lower())
+
+
+def _values(value):
+
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return value
+    return (value,)
+
+
+def _number(value):
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _contains_phrase(value, phrase):
+
+    # 多值字段的每个值分别判断，短语不跨越两个值
+    n = len(phrase)
+    for item in _values(value):
+        tokens = analyze(item)
+        for i in range(len(tokens) - n + 1):
+            if tokens[i:i + n] == phrase:
+                return True
+    return False
+
+
+def _in_range(value, node):
+
+    for item in _values(value):
+        if all(_compare(item, op, bound) for op, bound in node.bounds().items()):
+            return True
+    return False
+
+
+def _compare(value, op, bound):
+
+    a, b = _number(value), _number(bound)
+    if a is None and b is not None:
+        # 数值边界不与非数值比较，与 DocumentIndex 的数值列（非数值为 NaN）结果相同
+        return False
+    if a is None or b is None:
+        a, b = str(value), str(bound)
+    if op == "gt":
+        return a > b
+    if op == "gte":
+        return a >= b
+    if op == "lt":
+        return a < b
+    return a <= b
+
+
+class PredicateBackend(Backend):
+
+    # 把 AST 编译为闭包，执行时不再遍历 AST
+
+    def _and(self, node):
+        children = [self.render(child) for child in node.children]
+        return lambda doc: all(child(doc) for child in children)
+
+    def _or(self, node):
+        children = [self.render(child) for child in node.children]
+        return lambda doc: any(child(doc) for child in children)
+
+    def _not(self, node):
+        child = self.render(node.child)
+        return lambda doc: not child(doc)
+
+    def _term(self, node):
+        fields = self._fields_of(node)
+        if node.exact:
+            value = node.value
+            return lambda doc: any(
+                str(item) == value for f in fields for item in _values(doc.get(f))
+            )
+        tokens = set(analyze(node.value))
+        return lambda doc: any(
+            not tokens.isdisjoint(analyze(doc.get(f))) for f in fields
+        )
+
+    def _phrase(self, node):
+        fields = self._fields_of(node)
+        phrase = analyze(node.text)
+        return lambda doc: any(_contains_phrase(doc.get(f), phrase) for f in fields)
+
+    def _range(self, node):
+        return lambda doc: _in_range(doc.get(node.field), node)
+
+
+def compile_predicate(node, default_fields=None):
+    """返回 predicate(doc) -> bool"""
+
+    return PredicateBackend(default_fields).render(node)
+
+
+def dsl_predicate(dsl):
+    """把 DSL（QueryParser、SearchParser 或 optimize 的输出）编译为 predicate(doc) -> bool
+
+    用同一套匹配规则执行 DSL 本身，可以检查两个 DSL 是否匹配相同的文档。
+    """
+
+    if "query" in dsl and len(dsl) == 1:
+        dsl = dsl["query"]
+    (kind, body), = dsl.items()
+
+    if kind == "bool":
+        must = [dsl_predicate(c) for c in body.get("must", []) + body.get("filter", [])]
+        must_not = [dsl_predicate(c) for c in body.get("must_not", [])]
+        should = [dsl_predicate(c) for c in body.get("should", [])]
+        # 与 optimizer._effective_msm 相同：没有 must / filter 时至少匹配一个 should
+        msm = body.get("minimum_should_match", 0 if must else 1)
+        if not should:
+            msm = 0
+        return lambda doc: (
+            all(p(doc) for p in must)
+            and not any(p(doc) for p in must_not)
+            and sum(p(doc) for p in should) >= msm
+        )
+
+    if kind in ("multi_match", "match"):
+        if kind == "match":
+            (field, query), = body.items()
+            fields = [field]
+        else:
+            fields, query = body["fields"], body["query"]
+        if body.get("type") == "phrase":
+            phrase = analyze(query)
+            return lambda doc: any(_contains_phrase(doc.get(f), phrase) for f in fields)
+        tokens = set(analyze(query))
+        return lambda doc: any(not tokens.isdisjoint(analyze(doc.get(f))) for f in fields)
+
+    if kind in ("term", "terms"):
+        (field, values), = body.items()
+        values = {str(v) for v in _values(values)}
+        return lambda doc: any(str(item) in values for item in _values(doc.get(field)))
+
+    if kind == "range":
+        (field, bounds), = body.items()
+        node = Range(field, **bounds)
+        return lambda doc: _in_range(doc.get(field), node)
+
+    raise ValueError(f"Unsupported query: {kind}")
+
+
+class DocumentIndex:
+    """按列保存文档，倒排表和数值列在某个字段第一次被查询时才建立"""
+
+    def __init__(self, columns, size):
+
+        if np is None:
+            raise ImportError("DocumentIndex requires numpy")
+
+        self.columns = columns
+        self.size = size
+        self._postings = {}  # field -> {token: 文档编号数组}
+        self._exact = {}  # field -> {value: 文档编号数组}
+        self._numbers = {}  # field -> float 数组，缺失为 nan；有多值时为 None
+
+    @classmethod
+    def from_documents(cls, docs):
+
+        docs = list(docs)
+        fields = {}
+        for doc in docs:
+            fields.update(dict.fromkeys(doc))
+        columns = {f: [doc.get(f) for doc in docs] for f in fields}
+        return cls(columns, len(docs))
+
+    @classmethod
+    def from_columns(cls, columns):
+        """columns 为 {字段: 等长的列表或数组}"""
+
+        columns = dict(columns)
+        sizes = {len(column) for column in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError("All columns must have the same length")
+        return cls(columns, sizes.pop() if sizes else 0)
+
+    def document(self, i):
+
+        return {f: column[i] for f, column in self.columns.items()}
+
+    # -------- 延迟建立的索引 --------
+
+    def _build(self, cache, field, keys_of):
+
+        if field not in cache:
+            lists = {}
+            for i, value in enumerate(self.columns.get(field, ())):
+                for key in keys_of(value):
+                    ids = lists.get(key)
+                    if ids is None:
+                        lists[key] = [i]
+                    elif ids[-1] != i:
+                        ids.append(i)
+            cache[field] = {
+                key: np.array(ids, dtype=np.int64) for key, ids in lists.items()
+            }
+        return cache[field]
+
+    def postings(self, field, token):
+
+        index = self._build(self._postings, field, analyze)
+        return index.get(token)
+
+    def exact(self, field, value):
+
+        index = self._build(
+            self._exact, field, lambda v: [str(item) for item in _values(v)]
+        )
+        return index.get(value)
+
+    def numbers(self, field):
+
+        if field not in self._numbers:
+            column = np.full(self.size, np.nan)
+            for i, value in enumerate(self.columns.get(field, ())):
+                if isinstance(value, (list, tuple)):
+                    column = None
+                    break
+                number = _number(value)
+                if number is not None:
+                    column[i] = number
+            self._numbers[field] = column
+        return self._numbers[field]
+
+    # -------- 查询 --------
+
+    def mask(self, node, default_fields=None):
+        """长度为文档数的布尔数组"""
+
+        return MaskBackend(self, default_fields).render(node)
+
+    def search(self, node, default_fields=None):
+        """匹配的文档编号，升序"""
+
+        return np.flatnonzero(self.mask(node, default_fields))
+
+
+class MaskBackend(Backend):
+
+    def __init__(self, index, default_fields=None):
+        super().__init__(default_fields)
+        self.index = index
+
+    def _empty(self):
+        return np.zeros(self.index.size, dtype=bool)
+
+    def _and(self, node):
+        children = iter(node.children)
+        mask = self.render(next(children))
+        for child in children:
+            mask &= self.render(child)
+        return mask
+
+    def _or(self, node):
+        children = iter(node.children)
+        mask = self.render(next(children))
+        for child in children:
+            mask |= self.render(child)
+        return mask
+
+    def _not(self, node):
+        mask = self.render(node.child)
+        np.logical_not(mask, out=mask)
+        return mask
+
+    def _term(self, node):
+        mask = self._empty()
+        for field in self._fields_of(node):
+            if node.exact:
+                ids = [self.index.exact(field, node.value)]
+            else:
+                ids = [self.index.postings(field, t) for t in analyze(node.value)]
+            for posting in ids:
+                if posting is not None:
+                    mask[posting] = True
+        return mask
+
+    def _phrase(self, node):
+        phrase = analyze(node.text)
+        mask = self._empty()
+        if not phrase:
+            return mask
+        for field in self._fields_of(node):
+            # 先用倒排表求包含所有词的候选，再逐个核对词是否连续
+            postings = [self.index.postings(field, t) for t in set(phrase)]
+            if any(p is None for p in postings):
+                continue
+            candidates = postings[0]
+            for posting in postings[1:]:
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            column = self.index.columns[field]
+            for i in candidates:
+                if not mask[i] and _contains_phrase(column[i], phrase):
+                    mask[i] = True
+        return mask
+
+    def _range(self, node):
+        bounds = node.bounds()
+        numbers = self.index.numbers(node.field)
+        if numbers is not None and all(_number(b) is not None for b in bounds.values()):
+            mask = np.ones(self.index.size, dtype=bool)
+            for op, bound in bounds.items():
+                bound = _number(bound)
+                if op == "gt":
+                    mask &= numbers > bound
+                elif op == "gte":
+                    mask &= numbers >= bound
+                elif op == "lt":
+                    mask &= numbers < bound
+                else:
+                    mask &= numbers <= bound
+            return mask
+        column = self.index.columns.get(node.field, [None] * self.index.size)
+        return np.fromiter(
+            (_in_range(value, node) for value in column), dtype=bool, count=self.index.size
+        )
+
+
+if __name__ == "__main__":
+
+    from main import QueryParser
+
+    words = [f"w{i}" for i in range(5000)] + ["燃料", "电池", "电堆", "湿度"]
+    weights = list(accumulate(1 / (rank + 1) for rank in range(len(words))))
+    rng = random.Random(0)
+
+    docs = [
+        {
+            "title": " ".join(rng.choices(words, cum_weights=weights, k=8)),
+            "keywords": rng.choices(words, cum_weights=weights, k=3),
+            "APD": rng.randint(20100101, 20251231),
+        }
+        for _ in range(200_000)
+    ]
+
+    parser = QueryParser(["title", "keywords"])
+    node = parser.parse_ast(
+        '("燃料电池" OR 电堆 OR w7) AND NOT w3 AND APD:[20200101 TO 20251231]'
+    )
+
+    start = perf_counter()
+    predicate = compile_predicate(node, parser.default_fields)
+    scanned = [i for i, doc in enumerate(docs) if predicate(doc)]
+    print(f"scan: {len(scanned)} hits, {perf_counter() - start:.3f}s")
+
+    start = perf_counter()
+    index = DocumentIndex.from_documents(docs)
+    index.search(node, parser.default_fields)
+    print(f"index build + first query: {perf_counter() - start:.3f}s")
+
+    start = perf_counter()
+    ids = index.search(node, parser.default_fields)
+    print(f"indexed: {len(ids)} hits, {(perf_counter() - start) * 1000:.2f}ms")
+
+    assert ids.tolist() == scanned
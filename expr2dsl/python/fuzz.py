@@ -0,0 +1,139 @@
+"""随机生成语法正确的查询，交叉检查各条解析路径的结果
+
+    python fuzz.py --count 500 --depth 4 --width 4
+    python fuzz.py --count 10000 --write corpus.jsonl   # 写出语料，可交给 batch.py
+
+检查项：
+- 两阶段、inline、parse_ast + EsBackend、带缓存的解析得到完全相同的 DSL
+- QueryTransformer 与 LegacyQueryTransformer 得到相同的 DSL（包括嵌套字段，外层字段生效）
+- optimize 前后的 DSL、AST 谓词和 DocumentIndex 在随机文档上匹配相同的文档
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from evaluator import DocumentIndex, compile_predicate, dsl_predicate
+from legacy import LegacyQueryTransformer
+from main import QueryParser
+from optimizer import optimize
+from query_ast import EsBackend
+from query_cache import QueryCache
+
+
+FIELDS = ["title", "keywords"]
+
+WORDS = ["fuel", "cell", "stack", "membrane", "hydrogen", "燃料", "电池", "H01M8", "H01M4"]
+
+
+def random_leaf(rng):
+
+    kind = rng.random()
+    if kind < 0.55:
+        return rng.choice(WORDS)
+    if kind < 0.75:
+        return '"' + " ".join(rng.choices(WORDS, k=rng.randint(1, 2))) + '"'
+    if kind < 0.9:
+        return f"{rng.choice(['title', 'keywords', 'IPC'])}:{rng.choice(WORDS)}"
+    start = rng.randint(2000, 2020)
+    return f"APD:[{start} TO {start + rng.randint(0, 10)}]"
+
+
+def random_query(rng, depth, width):
+    """最多嵌套 depth 层括号，每层最多 width 个子表达式"""
+
+    if depth == 0 or rng.random() < 0.2:
+        query = random_leaf(rng)
+    else:
+        op = rng.choice([" AND ", " OR "])
+        parts = [random_query(rng, depth - 1, width) for _ in range(rng.randint(2, width))]
+        query = "(" + op.join(parts) + ")"
+        if rng.random() < 0.2:
+            query = f"{rng.choice(['title', 'keywords', 'IPC'])}:{query}"
+    if rng.random() < 0.15:
+        query = "NOT " + query
+    return query
+
+
+def corpus(count, depth, width, seed=0):
+
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield random_query(rng, depth, width)
+
+
+def random_document(rng):
+
+    return {
+        "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 6))),
+        "keywords": rng.choices(WORDS, k=rng.randint(0, 3)),
+        "IPC": rng.choice(["H01M8", "H01M4", "B60L"]),
+        # 偶尔是日期字符串，检查两条执行路径对非数值的范围比较一致
+        "APD": rng.randint(1995, 2025) if rng.random() < 0.9 else f"{rng.randint(1995, 2025)}-05-01",
+    }
+
+
+def cross_check(queries, docs):
+    """返回不一致的 (查询, 说明) 列表"""
+
+    two_phase = QueryParser(FIELDS)
+    inline = QueryParser(FIELDS, inline=True)
+    cached = QueryParser(FIELDS, cache=QueryCache())
+    index = DocumentIndex.from_documents(docs)
+    tree_parser = two_phase.parser
+
+    failures = []
+    for query in queries:
+        expected = two_phase.parse(query)
+        node = two_phase.parse_ast(query)
+
+        if inline.parse(query) != expected:
+            failures.append((query, "inline"))
+        if EsBackend(FIELDS).to_dsl(node) != expected:
+            failures.append((query, "parse_ast + EsBackend"))
+        if cached.parse(query) != expected or cached.parse(query) != expected:
+            failures.append((query, "cache"))
+        legacy = {"query": LegacyQueryTransformer(FIELDS).transform(tree_parser.parse(query))}
+        if legacy != expected:
+            failures.append((query, "legacy transformer"))
+
+        matches = [i for i, doc in enumerate(docs) if dsl_predicate(expected)(doc)]
+        predicate = compile_predicate(node, FIELDS)
+        if [i for i, doc in enumerate(docs) if predicate(doc)] != matches:
+            failures.append((query, "AST predicate"))
+        if index.search(node, FIELDS).tolist() != matches:
+            failures.append((query, "DocumentIndex"))
+        optimized = dsl_predicate(optimize(expected))
+        if [i for i, doc in enumerate(docs) if optimized(doc)] != matches:
+            failures.append((query, "optimize"))
+
+    return failures
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description="随机查询的交叉检查")
+    arg_parser.add_argument("--count", type=int, default=500)
+    arg_parser.add_argument("--depth", type=int, default=4)
+    arg_parser.add_argument("--width", type=int, default=4)
+    arg_parser.add_argument("--docs", type=int, default=200)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--write", metavar="JSONL", help="只写出语料，不做检查")
+    args = arg_parser.parse_args()
+
+    queries = corpus(args.count, args.depth, args.width, args.seed)
+
+    if args.write:
+        with open(args.write, "w", encoding="utf-8") as f:
+            for i, query in enumerate(queries):
+                f.write(json.dumps({"id": i, "query": query}, ensure_ascii=False) + "\n")
+        sys.exit(0)
+
+    rng = random.Random(args.seed)
+    docs = [random_document(rng) for _ in range(args.docs)]
+    failures = cross_check(queries, docs)
+    for query, check in failures[:20]:
+        print(f"{check}: {query}")
+    print(f"{args.count} queries, {len(failures)} mismatches")
+    sys.exit(1 if failures else 0)
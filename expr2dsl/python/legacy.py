@@ -0,0 +1,165 @@
+from lark import Transformer
+
+
+class LegacyQueryTransformer(Transformer):
+
+    # 原始实现：自底向上构建 DSL，每遇到一个 FIELD: 就重新遍历并改写整棵子树，
+    # 嵌套字段的代价为 O(深度 × 子树大小)，且外层字段覆盖内层。仅作为 benchmark.py 的对照保留。
+
+    def __init__(self, default_fields):
+        self.default_fields = default_fields
+
+    # -------- 基础词 --------
+
+    def word(self, items):
+        text = items[0].value
+        return self._multi_match(text)
+
+    def phrase(self, items):
+        text = items[0].value.strip('"')
+        return self._phrase_match(text)
+
+    def group(self, items):
+        return items[0]
+
+    # -------- 字段 --------
+
+    def field(self, items):
+
+        field = items[0].value
+        query = items[1]
+
+        return self._apply_field(query, field)
+
+    # -------- range --------
+
+    def range(self, items):
+
+        field = items[0].value
+        start = items[1].value
+        end = items[3].value
+
+        return {
+            "range": {
+                field: {
+                    "gte": start,
+                    "lte": end
+                }
+            }
+        }
+
+    # -------- 逻辑 --------
+
+    def _is_simple_bool_should(self, node):
+        if not isinstance(node, dict) or "bool" not in node:
+            return False
+        b = node["bool"]
+        if not isinstance(b, dict):
+            return False
+        if "should" not in b:
+            return False
+        # 只合并“纯 should”节点，避免改变更复杂 bool 语义
+        for k in b.keys():
+            if k not in {"should", "minimum_should_match"}:
+                return False
+        return b.get("minimum_should_match", 1) == 1 and isinstance(b["should"], list)
+
+    def _is_simple_bool_must(self, node):
+        if not isinstance(node, dict) or "bool" not in node:
+            return False
+        b = node["bool"]
+        if not isinstance(b, dict):
+            return False
+        if "must" not in b:
+            return False
+        for k in b.keys():
+            if k != "must":
+                return False
+        return isinstance(b["must"], list)
+
+    def and_expr(self, items):
+
+        left = items[0]
+        right = items[2]
+
+        must = []
+        if self._is_simple_bool_must(left):
+            must.extend(left["bool"]["must"])
+        else:
+            must.append(left)
+
+        if self._is_simple_bool_must(right):
+            must.extend(right["bool"]["must"])
+        else:
+            must.append(right)
+
+        return {"bool": {"must": must}}
+
+    def or_expr(self, items):
+
+        left = items[0]
+        right = items[2]
+
+        should = []
+        if self._is_simple_bool_should(left):
+            should.extend(left["bool"]["should"])
+        else:
+            should.append(left)
+
+        if self._is_simple_bool_should(right):
+            should.extend(right["bool"]["should"])
+        else:
+            should.append(right)
+
+        return {"bool": {"should": should, "minimum_should_match": 1}}
+
+    def not_expr(self, items):
+
+        expr = items[1]
+
+        return {
+            "bool": {
+                "must_not": [expr]
+            }
+        }
+
+    # -------- DSL --------
+
+    def _multi_match(self, text):
+
+        return {
+            "multi_match": {
+                "query": text,
+                "fields": self.default_fields
+            }
+        }
+
+    def _phrase_match(self, text):
+
+        return {
+            "multi_match": {
+                "query": text,
+                "type": "phrase",
+                "fields": self.default_fields
+            }
+        }
+
+    # -------- 字段递归 --------
+
+    def _apply_field(self, query, field):
+
+        if "multi_match" in query:
+            query["multi_match"]["fields"] = [field]
+
+        elif "bool" in query:
+
+            for k in ["must", "should", "must_not"]:
+
+                if k in query["bool"]:
+
+                    query["bool"][k] = [
+                        self._apply_field(x, field)
+                        for x in query["bool"][k]
+                    ]
+
+        return query
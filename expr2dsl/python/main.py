@@ -1,5 +1,11 @@
-from lark import Lark, Transformer
+from functools import lru_cache
+from lark import Lark, Transformer, Tree
 import json
+import re
+
+from optimizer import optimize, report
+from query_ast import And, EsBackend, Field, Not, Or, Phrase, Range, Term
+from query_cache import QueryCache
 
 
 grammar = r"""
@@ -27,10 +33,14 @@ field: FIELD ":" atom
 range: FIELD ":" "[" WORD TO WORD "]"
 
 # ---------- 运算符 ----------
-AND: /(?i:and)/
-OR: /(?i:or)/
-NOT: /(?i:not)/
-TO: /(?i:to)/
+#
+# 关键字优先于 WORD，且后面不能紧跟词字符，
+# 否则 NOT a 中的 NOT 会被识别为 WORD，而 android 又会被拆成 AND + roid。
+
+AND.2: /(?i:and)(?![^\s()":\[\]])/
+OR.2: /(?i:or)(?![^\s()":\[\]])/
+NOT.2: /(?i:not)(?![^\s()":\[\]])/
+TO.2: /(?i:to)(?![^\s()":\[\]])/
 
 # ---------- token ----------
 #
@@ -47,36 +57,94 @@ PHRASE: /"[^"]+"/
 %ignore WS
 """
 
-class QueryTransformer(Transformer):
+@lru_cache(maxsize=None)
+def build_parser():
+
+    # 每个进程只生成一次 LALR 解析表，所有 QueryParser 共享同一个 Lark 实例；
+    # cache=True 时 Lark 把解析表序列化到临时目录（按语法和版本区分），
+    # 新进程启动时直接从磁盘加载，不再重新生成
+    return Lark(grammar, parser="lalr", cache=True)
+
+
+@lru_cache(maxsize=None)
+def build_inline_parser():
+
+    # LALR 每归约一条规则就调用 AstTransformer，直接得到 AST，不生成语法树。
+    # AST 中连续的 AND / OR 已拍平，之后的渲染不会因为几百个 OR 的同义词而递归过深
+    return Lark(grammar, parser="lalr", cache=True, transformer=AstTransformer())
+
+
+# 短语外的连续空白对解析结果没有影响，归一化后作为缓存的 key
+_SPACES_OUTSIDE_PHRASE = re.compile(r'("[^"]*")|\s+')
+
+
+def normalize_query(query):
+
+    return _SPACES_OUTSIDE_PHRASE.sub(
+        lambda m: m.group(1) or " ", query
+    ).strip()
+
+
+class QueryTransformer:
+
+    # 用显式栈自底向上转换语法树，不递归：几百个 OR 在一起的同义词、很深的括号
+    # 或字段嵌套都不受 Python 递归深度的限制。每个节点入栈时带上它所在的字段作用域，
+    # FIELD: 只修改子树的作用域，词在生成时就带上正确的字段，整棵树只遍历一次。
+    # 嵌套时与原来自底向上覆盖的结果相同，外层字段生效：A:(B:(x)) 在 A 中检索 x。
 
     def __init__(self, default_fields):
         self.default_fields = default_fields
 
+    def transform(self, tree):
+
+        results = []
+        # (节点, 外层字段或 None, 子节点是否已转换)
+        stack = [(tree, None, False)]
+
+        while stack:
+            node, scope, done = stack.pop()
+
+            if not isinstance(node, Tree):
+                results.append(node)
+                continue
+
+            if done:
+                count = len(node.children)
+                items = results[len(results) - count:]
+                del results[len(results) - count:]
+                results.append(getattr(self, node.data)(items, scope or self.default_fields))
+                continue
+
+            stack.append((node, scope, True))
+            if node.data == "field" and scope is None:
+                scope = [node.children[0].value]
+            # 逆序入栈，子节点按原顺序转换
+            stack.extend((child, scope, False) for child in reversed(node.children))
+
+        return results[0]
+
     # -------- 基础词 --------
 
-    def word(self, items):
+    def word(self, items, fields):
         text = items[0].value
-        return self._multi_match(text)
+        return self._multi_match(text, fields)
 
-    def phrase(self, items):
+    def phrase(self, items, fields):
         text = items[0].value.strip('"')
-        return self._phrase_match(text)
+        return self._phrase_match(text, fields)
 
-    def group(self, items):
+    def group(self, items, fields):
         return items[0]
 
     # -------- 字段 --------
 
-    def field(self, items):
-
-        field = items[0].value
-        query = items[1]
-
-        return self._apply_field(query, field)
+    def field(self, items, fields):
+        # 子树在入栈时已带上字段作用域
+        return items[1]
 
     # -------- range --------
 
-    def range(self, items):
+    def range(self, items, fields):
 
         field = items[0].value
         start = items[1].value
@@ -120,7 +188,7 @@ class QueryTransformer(Transformer):
                 return False
         return isinstance(b["must"], list)
 
-    def and_expr(self, items):
+    def and_expr(self, items, fields):
 
         left = items[0]
         right = items[2]
@@ -138,7 +206,7 @@ class QueryTransformer(Transformer):
 
         return {"bool": {"must": must}}
 
-    def or_expr(self, items):
+    def or_expr(self, items, fields):
 
         left = items[0]
         right = items[2]
@@ -156,7 +224,7 @@ class QueryTransformer(Transformer):
 
         return {"bool": {"should": should, "minimum_should_match": 1}}
 
-    def not_expr(self, items):
+    def not_expr(self, items, fields):
 
         expr = items[1]
 
@@ -168,66 +236,126 @@ class QueryTransformer(Transformer):
 
     # -------- DSL --------
 
-    def _multi_match(self, text):
+    def _multi_match(self, text, fields):
 
         return {
             "multi_match": {
                 "query": text,
-                "fields": self.default_fields
+                "fields": fields
             }
         }
 
-    def _phrase_match(self, text):
+    def _phrase_match(self, text, fields):
 
         return {
             "multi_match": {
                 "query": text,
                 "type": "phrase",
-                "fields": self.default_fields
+                "fields": fields
             }
         }
 
-    # -------- 字段递归 --------
 
-    def _apply_field(self, query, field):
+class AstTransformer(Transformer):
+
+    # 自底向上把语法树转换为 query_ast 节点；字段不在这里展开，
+    # 由 Field 节点记录，交给后端渲染时按作用域解析
+
+    def word(self, items):
+        return Term(items[0].value)
+
+    def phrase(self, items):
+        return Phrase(items[0].value.strip('"'))
 
-        if "multi_match" in query:
-            query["multi_match"]["fields"] = [field]
+    def group(self, items):
+        return items[0]
 
-        elif "bool" in query:
+    def field(self, items):
+        return Field(items[0].value, items[1])
 
-            for k in ["must", "should", "must_not"]:
+    def range(self, items):
+        return Range(items[0].value, gte=items[1].value, lte=items[3].value)
 
-                if k in query["bool"]:
+    def and_expr(self, items):
+        return And.of(items[0], items[2])
 
-                    query["bool"][k] = [
-                        self._apply_field(x, field)
-                        for x in query["bool"][k]
-                    ]
+    def or_expr(self, items):
+        return Or.of(items[0], items[2])
 
-        return query
+    def not_expr(self, items):
+        return Not(items[1])
 
 
 class QueryParser:
 
-    def __init__(self, default_fields=None):
+    def __init__(
+        self,
+        default_fields=None,
+        cache=None,
+        optimized=False,
+        terms_fields=(),
+        inline=False,
+    ):
 
         if default_fields is None:
             default_fields = ["title", "keywords"]
 
         self.default_fields = default_fields
 
-        self.parser = Lark(grammar, parser="lalr")
+        # 可在多个 QueryParser 之间共享的 QueryCache，key 包含默认字段
+        self.cache = cache
+
+        # 是否对 DSL 做 optimizer.optimize；terms_fields 为可合并为 terms 的 keyword 字段
+        self.optimized = optimized
+        self.terms_fields = frozenset(terms_fields)
+
+        # inline=True 时在解析过程中构建 AST 再渲染为 DSL，结果与两阶段相同，
+        # 峰值内存更低，适合很长的查询
+        self.inline = inline
+
+        self.parser = build_parser()
 
     def parse(self, query):
 
-        tree = self.parser.parse(query)
+        if self.cache is None:
+            return self._parse(query)
 
-        transformer = QueryTransformer(self.default_fields)
+        key = (
+            normalize_query(query),
+            tuple(self.default_fields),
+            self.optimized,
+            self.terms_fields,
+        )
 
-        return {
-            "query": transformer.transform(tree)
-        }
+        return self.cache.get_or_parse(key, lambda: self._parse(query))
+
+    def parse_ast(self, query):
+
+        # 只解析一次，之后可用 query_ast 的任意后端渲染，
+        # EsBackend(default_fields).to_dsl(node) 与 parse(query) 的结果相同
+        if self.inline:
+            return build_inline_parser().parse(query)
+
+        return AstTransformer().transform(self.parser.parse(query))
+
+    def _parse(self, query):
+
+        if self.inline:
+            node = build_inline_parser().parse(query)
+            dsl = EsBackend(self.default_fields).to_dsl(node)
+        else:
+            tree = self.parser.parse(query)
+
+            transformer = QueryTransformer(self.default_fields)
+
+            dsl = {
+                "query": transformer.transform(tree)
+            }
+
+        if self.optimized:
+            return optimize(dsl, self.terms_fields)
+
+        return dsl
 
 
 if __name__ == "__main__":
@@ -246,6 +374,8 @@ if __name__ == "__main__":
 
     dsl = parser.parse(q)
 
+    print(report(dsl, optimize(dsl, {"IPC"})))
+
     with open("dsl.json", "w", encoding="utf-8") as f:
         json.dump(dsl, f, ensure_ascii=False, indent=2) 
     print("done")
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""QueryTransformer 输出的后处理优化，让 Elasticsearch 执行更少、更浅的 bool 子句
+
+- 任意层级的 AND / OR 拍平为 n 元 must / should
+- 删除同一子句列表中的重复子句
+- 把 must 中子 bool 的 must_not 合并到父 bool，NOT (a OR b) 展开为 must_not [a, b]
+- 只有一个子句的 bool 直接替换为该子句
+- 可选：同一 keyword 字段上 OR 的多个 multi_match 合并为一个 terms
+"""
+
+import json
+
+
+def _effective_msm(b):
+
+    # 没有 must / filter 时，ES 默认至少匹配一个 should
+    if "minimum_should_match" in b:
+        return b["minimum_should_match"]
+    return 0 if b.get("must") or b.get("filter") else 1
+
+
+def _is_or(node):
+
+    if "bool" not in node:
+        return False
+    b = node["bool"]
+    return set(b) <= {"should", "minimum_should_match"} and _effective_msm(b) == 1
+
+
+def _is_and(node):
+
+    return "bool" in node and set(node["bool"]) <= {"must", "must_not", "filter"}
+
+
+def _dedupe(clauses):
+
+    seen = set()
+    unique = []
+    for clause in clauses:
+        key = json.dumps(clause, sort_keys=True, ensure_ascii=False)
+        if key not in seen:
+            seen.add(key)
+            unique.append(clause)
+    return unique
+
+
+def _merge_terms(clauses, terms_fields):
+
+    # 同一字段上的多个词项 OR 在一起，等价于一个 terms（该字段须为 keyword 类型）
+    groups = {}
+    order = []
+    for clause in clauses:
+        mm = clause.get("multi_match")
+        if (
+            mm is not None
+            and len(clause) == 1
+            and set(mm) == {"query", "fields"}
+            and len(mm["fields"]) == 1
+            and mm["fields"][0] in terms_fields
+        ):
+            field = mm["fields"][0]
+            if field not in groups:
+                groups[field] = []
+                order.append(field)
+            groups[field].append(clause)
+        else:
+            order.append(clause)
+
+    merged = []
+    for item in order:
+        if isinstance(item, dict):
+            merged.append(item)
+        elif len(groups[item]) == 1:
+            merged.append(groups[item][0])
+        else:
+            values = [c["multi_match"]["query"] for c in groups[item]]
+            merged.append({"terms": {item: values}})
+    return merged
+
+
+def optimize(node, terms_fields=()):
+    """返回优化后的新 DSL，不修改传入的 node；node 可以带或不带最外层的 "query" """
+
+    if "query" in node and len(node) == 1:
+        return {"query": optimize(node["query"], terms_fields)}
+
+    if "bool" not in node:
+        return node
+
+    b = node["bool"]
+    must, should, must_not, filter_ = [], [], [], []
+
+    # 没有显式 minimum_should_match 时，must 变空会让 should 从可选变为必选，此时不提升
+    hoist = not b.get("should") or "minimum_should_match" in b
+    for child in (optimize(c, terms_fields) for c in b.get("must", [])):
+        if hoist and _is_and(child):
+            must.extend(child["bool"].get("must", []))
+            must_not.extend(child["bool"].get("must_not", []))
+            filter_.extend(child["bool"].get("filter", []))
+        else:
+            must.append(child)
+
+    for child in (optimize(c, terms_fields) for c in b.get("filter", [])):
+        filter_.append(child)
+
+    for child in (optimize(c, terms_fields) for c in b.get("must_not", [])):
+        # NOT (a OR b) == NOT a AND NOT b
+        if _is_or(child):
+            must_not.extend(child["bool"]["should"])
+        else:
+            must_not.append(child)
+
+    flatten_should = _effective_msm(b) == 1
+    for child in (optimize(c, terms_fields) for c in b.get("should", [])):
+        if flatten_should and _is_or(child):
+            should.extend(child["bool"]["should"])
+        else:
+            should.append(child)
+
+    must = _dedupe(must)
+    filter_ = _dedupe(filter_)
+    must_not = _dedupe(must_not)
+    should = _dedupe(should)
+    if terms_fields:
+        must_not = _merge_terms(must_not, terms_fields)
+        if flatten_should:
+            should = _merge_terms(should, terms_fields)
+
+    if len(must) == 1 and not (should or must_not or filter_):
+        return must[0]
+    if len(should) == 1 and flatten_should and not (must or must_not or filter_):
+        return should[0]
+
+    result = {}
+    for key, clauses in (
+        ("must", must),
+        ("should", should),
+        ("must_not", must_not),
+        ("filter", filter_),
+    ):
+        if clauses:
+            result[key] = clauses
+    if "minimum_should_match" in b and should:
+        result["minimum_should_match"] = b["minimum_should_match"]
+    return {"bool": result}
+
+
+def count_nodes(node):
+    """DSL 中查询子句的数量与最大嵌套深度"""
+
+    if "query" in node and len(node) == 1:
+        return count_nodes(node["query"])
+
+    if "bool" not in node:
+        return 1, 1
+
+    count, depth = 1, 0
+    for key in ("must", "should", "must_not", "filter"):
+        for child in node["bool"].get(key, []):
+            c, d = count_nodes(child)
+            count += c
+            depth = max(depth, d)
+    return count, depth + 1
+
+
+def report(before, after):
+
+    (n0, d0), (n1, d1) = count_nodes(before), count_nodes(after)
+    return f"nodes: {n0} -> {n1}, depth: {d0} -> {d1}"
@@ -0,0 +1,311 @@
+"""查询的紧凑中间表示（AST），由 expr2dsl 的 QueryParser 与 re_parser 的 SearchParser 共用
+
+解析一次得到 AST，再交给不同的后端输出：
+
+    EsBackend    Elasticsearch Query DSL
+    JsonBackend  紧凑 JSON（可用 from_json 还原）
+    SqlBackend   带占位符的 SQL WHERE 子句
+
+节点使用 __slots__，不为每个节点分配 __dict__。
+Term / Phrase 的 fields 为 None 时表示继承外层 Field 的字段，没有外层 Field 时使用后端的默认字段。
+"""
+
+import json
+import re
+
+
+class Node:
+
+    __slots__ = ()
+
+    _attrs = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 比较、哈希与 repr 使用的属性，包括父类的 slot：Or 不声明新的 slot，只继承 And 的 children
+        cls._attrs = tuple(
+            name for klass in reversed(cls.__mro__) for name in klass.__dict__.get("__slots__", ())
+        )
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self._attrs
+        )
+
+    def __hash__(self):
+        return hash((type(self),) + tuple(getattr(self, n) for n in self._attrs))
+
+    def __repr__(self):
+        args = ", ".join(repr(getattr(self, name)) for name in self._attrs)
+        return f"{type(self).__name__}({args})"
+
+
+class And(Node):
+
+    __slots__ = ("children",)
+
+    def __init__(self, children):
+        self.children = tuple(children)
+
+    @classmethod
+    def of(cls, left, right):
+        # 左结合的 a AND b AND c 直接拍平为 n 元节点，AST 深度不随查询长度增长
+        children = left.children if type(left) is cls else (left,)
+        return cls(children + (right,))
+
+
+class Or(And):
+
+    __slots__ = ()
+
+
+class Not(Node):
+
+    __slots__ = ("child",)
+
+    def __init__(self, child):
+        self.child = child
+
+
+class Field(Node):
+    """FIELD:(...)，子树中未指定字段的 Term / Phrase 在 name 字段中检索"""
+
+    __slots__ = ("name", "child")
+
+    def __init__(self, name, child):
+        self.name = name
+        self.child = child
+
+
+class Term(Node):
+    """exact 为 True 时要求字段值完全相等（ES term），否则为分词匹配"""
+
+    __slots__ = ("fields", "value", "exact")
+
+    def __init__(self, value, fields=None, exact=False):
+        self.value = value
+        self.fields = tuple(fields) if fields is not None else None
+        self.exact = exact
+
+
+class Phrase(Node):
+
+    __slots__ = ("fields", "text")
+
+    def __init__(self, text, fields=None):
+        self.text = text
+        self.fields = tuple(fields) if fields is not None else None
+
+
+class Range(Node):
+
+    __slots__ = ("field", "gt", "gte", "lt", "lte")
+
+    def __init__(self, field, gt=None, gte=None, lt=None, lte=None):
+        self.field = field
+        self.gt = gt
+        self.gte = gte
+        self.lt = lt
+        self.lte = lte
+
+    def bounds(self):
+        return {
+            op: getattr(self, op)
+            for op in ("gt", "gte", "lt", "lte")
+            if getattr(self, op) is not None
+        }
+
+
+class Backend:
+    """按节点类型分派到 _and / _or / _not / _field / _term / _phrase / _range"""
+
+    def __init__(self, default_fields=None):
+        self.default_fields = list(default_fields or [])
+        self.fields = self.default_fields
+        self.in_field = False
+
+    def render(self, node):
+        return getattr(self, "_" + type(node).__name__.lower())(node)
+
+    def _field(self, node):
+        # 嵌套的字段以最外层为准：A:(B:(x)) 在 A 中检索 x
+        if self.in_field:
+            return self.render(node.child)
+        self.fields = [node.name]
+        self.in_field = True
+        try:
+            return self.render(node.child)
+        finally:
+            self.fields = self.default_fields
+            self.in_field = False
+
+    def _fields_of(self, node):
+        return list(node.fields) if node.fields is not None else self.fields
+
+
+class EsBackend(Backend):
+    """与 QueryTransformer 的输出一致：拍平纯 must / 纯 should，OR 带 minimum_should_match"""
+
+    def to_dsl(self, node):
+        return {"query": self.render(node)}
+
+    def _and(self, node):
+        must = []
+        for child in map(self.render, node.children):
+            b = child.get("bool")
+            if b is not None and set(b) == {"must"}:
+                must.extend(b["must"])
+            else:
+                must.append(child)
+        return {"bool": {"must": must}}
+
+    def _or(self, node):
+        should = []
+        for child in map(self.render, node.children):
+            b = child.get("bool")
+            if (
+                b is not None
+                and set(b) <= {"should", "minimum_should_match"}
+                and b.get("minimum_should_match", 1) == 1
+            ):
+                should.extend(b["should"])
+            else:
+                should.append(child)
+        return {"bool": {"should": should, "minimum_should_match": 1}}
+
+    def _not(self, node):
+        return {"bool": {"must_not": [self.render(node.child)]}}
+
+    def _term(self, node):
+        fields = self._fields_of(node)
+        if node.exact and len(fields) == 1:
+            return {"term": {fields[0]: node.value}}
+        return {"multi_match": {"query": node.value, "fields": fields}}
+
+    def _phrase(self, node):
+        return {
+            "multi_match": {
+                "query": node.text,
+                "type": "phrase",
+                "fields": self._fields_of(node),
+            }
+        }
+
+    def _range(self, node):
+        return {"range": {node.field: node.bounds()}}
+
+
+class JsonBackend(Backend):
+    """紧凑的数组形式，如 ["and", ["term", "car", null, false], ...]"""
+
+    def dumps(self, node):
+        return json.dumps(self.render(node), ensure_ascii=False, separators=(",", ":"))
+
+    def _and(self, node):
+        return ["and"] + [self.render(child) for child in node.children]
+
+    def _or(self, node):
+        return ["or"] + [self.render(child) for child in node.children]
+
+    def _not(self, node):
+        return ["not", self.render(node.child)]
+
+    def _field(self, node):
+        return ["field", node.name, self.render(node.child)]
+
+    def _term(self, node):
+        fields = list(node.fields) if node.fields is not None else None
+        return ["term", node.value, fields, node.exact]
+
+    def _phrase(self, node):
+        fields = list(node.fields) if node.fields is not None else None
+        return ["phrase", node.text, fields]
+
+    def _range(self, node):
+        return ["range", node.field, node.bounds()]
+
+
+def from_json(data):
+    """JsonBackend 的逆操作，data 可以是 JSON 字符串或已解析的数组"""
+
+    if isinstance(data, str):
+        data = json.loads(data)
+    kind, args = data[0], data[1:]
+    if kind == "and":
+        return And(from_json(child) for child in args)
+    if kind == "or":
+        return Or(from_json(child) for child in args)
+    if kind == "not":
+        return Not(from_json(args[0]))
+    if kind == "field":
+        return Field(args[0], from_json(args[1]))
+    if kind == "term":
+        return Term(args[0], args[1], args[2])
+    if kind == "phrase":
+        return Phrase(args[0], args[1])
+    if kind == "range":
+        return Range(args[0], **args[1])
+    raise ValueError(f"Unknown node: {kind}")
+
+
+class SqlBackend(Backend):
+    """生成 (where, params)，值一律通过 ? 占位符传递；分词匹配近似为 LIKE '%值%'
+    值中的 % _ 和转义符本身用反斜杠转义，并带上 ESCAPE 子句，a_b 不会匹配 axb
+    """
+
+    _IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+    _OPS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+    def to_sql(self, node):
+        self.params = []
+        return self.render(node), self.params
+
+    def _column(self, name):
+        if self._IDENTIFIER.fullmatch(name):
+            return name
+        return '"' + name.replace('"', '""') + '"'
+
+    def _join(self, op, parts):
+        if len(parts) == 1:
+            return parts[0]
+        return "(" + f" {op} ".join(parts) + ")"
+
+    def _and(self, node):
+        return self._join("AND", [self.render(child) for child in node.children])
+
+    def _or(self, node):
+        return self._join("OR", [self.render(child) for child in node.children])
+
+    def _not(self, node):
+        return f"NOT {self.render(node.child)}"
+
+    _LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+    def _match(self, fields, op, value, placeholder="?"):
+        parts = []
+        for field in fields:
+            parts.append(f"{self._column(field)} {op} {placeholder}")
+            self.params.append(value)
+        if not parts:
+            raise ValueError("No field to search in")
+        return self._join("OR", parts)
+
+    def _contains(self, fields, text):
+        pattern = "%" + self._LIKE_SPECIAL.sub(r"\\\1", text) + "%"
+        return self._match(fields, "LIKE", pattern, "? ESCAPE '\\'")
+
+    def _term(self, node):
+        if node.exact:
+            return self._match(self._fields_of(node), "=", node.value)
+        return self._contains(self._fields_of(node), node.value)
+
+    def _phrase(self, node):
+        return self._contains(self._fields_of(node), node.text)
+
+    def _range(self, node):
+        parts = []
+        for op, value in node.bounds().items():
+            parts.append(f"{self._column(node.field)} {self._OPS[op]} ?")
+            self.params.append(value)
+        return self._join("AND", parts)
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+import json
+
+
+class QueryCache:
+    """ 线程安全的 LRU 缓存，保存解析后的 DSL
+    缓存中存放的是 DSL 的 JSON 字符串，命中时 json.loads 得到一份新的字典，
+    调用方修改结果不会污染缓存；json.loads 比 deepcopy 和重新解析都快得多
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_parse(self, key: Hashable, parse: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                serialized = self._data[key]
+            else:
+                serialized = None
+                self.misses += 1
+        if serialized is not None:
+            return json.loads(serialized)
+        # 在锁外解析，避免一个慢查询阻塞其他线程；解析失败的查询不缓存
+        result = parse()
+        serialized = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._data[key] = serialized
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        # 缓存只持有字符串，新解析的结果可以直接交给调用方
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,207 @@
+"""批量压缩目录树中的PNG图片
+
+    python batch.py screenshots/ -o screenshots_compressed/ --workers 8
+
+输出目录保持与输入相同的目录结构。输出目录的 .compressed.json 记录每个文件上次压缩时
+源文件的sha256与压缩参数；参数相同的文件会被跳过：输出文件比源文件新时直接跳过，否则比较sha256，
+内容未变也跳过。参数不同（例如之后加上 --tune 或 --tiled）时重新压缩。每个文件先写入同目录的
+临时文件再 os.replace，中断时不会留下写了一半的PNG。
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+from png_compressor import PNGCompressor
+
+MANIFEST = '.compressed.json'
+
+_compressor = None
+
+# mkstemp 创建的临时文件权限为0600，替换前改为按 umask 创建普通文件时的权限
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_images(root, extensions=('.png',), exclude=None):
+    """按路径顺序产生 root 下所有图片相对于 root 的路径，跳过 exclude 目录（输出目录）"""
+    exclude = os.path.abspath(exclude) if exclude else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != exclude
+        )
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.relpath(os.path.join(dirpath, filename), root)
+
+
+def _init_worker(max_image_pixels):
+    # 工作进程沿用主进程的 MAX_IMAGE_PIXELS（--tiled 时不限制）
+    global _compressor
+    Image.MAX_IMAGE_PIXELS = max_image_pixels
+    _compressor = PNGCompressor()
+
+
+def compress_one(task):
+    """压缩单个文件，返回结果字典；status 为 compressed、skipped 或 failed
+
+    known 为清单中该文件的记录，只有记录的压缩参数与 options 相同时才可能跳过
+    """
+    src, dst, known, force, options = task
+    result = {'src': src, 'input_size': 0}
+    try:
+        result['input_size'] = os.path.getsize(src)
+        known_hash = known['sha256'] if known and known['options'] == options else None
+        if not force and known_hash and os.path.exists(dst):
+            if os.path.getmtime(dst) >= os.path.getmtime(src):
+                return dict(result, status='skipped', sha256=known_hash)
+            digest = file_hash(src)
+            if digest == known_hash:
+                # 内容未变（例如只是被 touch 过），更新输出的 mtime，下次直接按 mtime 跳过
+                os.utime(dst)
+                return dict(result, status='skipped', sha256=digest)
+        else:
+            digest = file_hash(src)
+
+        os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix='.' + os.path.basename(dst), suffix='.tmp', dir=os.path.dirname(dst) or '.'
+        )
+        os.close(fd)
+        try:
+            info = (_compressor or PNGCompressor()).compress(src, tmp_path, **options)
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return dict(result, status='compressed', sha256=digest, output_size=info['compressed_size'])
+    except Exception as e:
+        return dict(result, status='failed', error=f"{type(e).__name__}: {e}")
+
+
+def load_manifest(output_root):
+    """相对路径 -> {'sha256': ..., 'options': {...}}"""
+    path = os.path.join(output_root, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    # 旧的清单只记录了sha256，当时只能用默认参数压缩
+    return {
+        rel: {'sha256': entry, 'options': {}} if isinstance(entry, str) else entry
+        for rel, entry in manifest.items()
+    }
+
+
+def save_manifest(output_root, manifest):
+    path = os.path.join(output_root, MANIFEST)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def compress_tree(input_root, output_root, workers=1, force=False, chunksize=4, **options):
+    """压缩 input_root 下的所有PNG，按输入顺序产生每个文件的结果
+    options 传给 PNGCompressor.compress，例如 tune=True, min_psnr=40, time_budget=2 或 tiled=True
+    """
+    manifest = load_manifest(output_root)
+    tasks = [
+        (os.path.join(input_root, rel), os.path.join(output_root, rel), manifest.get(rel), force, options)
+        for rel in find_images(input_root, exclude=output_root)
+    ]
+    rel_of = {task[0]: os.path.relpath(task[0], input_root) for task in tasks}
+
+    try:
+        if workers <= 1:
+            _init_worker(Image.MAX_IMAGE_PIXELS)
+            results = map(compress_one, tasks)
+            for result in results:
+                _record(manifest, rel_of, result, options)
+                yield result
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(Image.MAX_IMAGE_PIXELS,)) as executor:
+                for result in executor.map(compress_one, tasks, chunksize=chunksize):
+                    _record(manifest, rel_of, result, options)
+                    yield result
+    finally:
+        # 中途中断时也保存已完成的记录
+        os.makedirs(output_root, exist_ok=True)
+        save_manifest(output_root, manifest)
+
+
+def _record(manifest, rel_of, result, options):
+    if result.get('sha256'):
+        manifest[rel_of[result['src']]] = {'sha256': result['sha256'], 'options': options}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量压缩目录中的PNG图片")
+    parser.add_argument('input', help="输入目录")
+    parser.add_argument('-o', '--output', help="输出目录，默认为 <input>_compressed")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help="不跳过已压缩的文件")
+    parser.add_argument('--tune', action='store_true', help="逐张搜索输出最小的压缩参数")
+    parser.add_argument('--min-psnr', type=float, default=40.0, help="调参时的质量下限（dB）")
+    parser.add_argument('--time-budget', type=float, default=2.0, help="调参时每张图片的时间预算（秒）")
+    parser.add_argument('--tiled', action='store_true', help="按条带压缩，适合超大图片，不能与 --tune 同时使用")
+    parser.add_argument('--tile-rows', type=int, default=256, help="分块压缩时每个条带的行数")
+    args = parser.parse_args()
+
+    input_root = os.path.normpath(args.input)
+    output_root = args.output or input_root + '_compressed'
+    if os.path.abspath(output_root) == os.path.abspath(input_root):
+        parser.error("output directory must differ from the input directory")
+    if args.tune and args.tiled:
+        parser.error("--tune and --tiled are mutually exclusive")
+
+    counts = {'compressed': 0, 'skipped': 0, 'failed': 0}
+    input_bytes = output_bytes = 0
+    start = time.perf_counter()
+    options = {}
+    if args.tune:
+        options = {'tune': True, 'min_psnr': args.min_psnr, 'time_budget': args.time_budget}
+    elif args.tiled:
+        options = {'tiled': True, 'tile_rows': args.tile_rows}
+        Image.MAX_IMAGE_PIXELS = None  # 与 tiled.py 相同，本模式就是为超大图片准备的
+    for result in compress_tree(input_root, output_root, args.workers, args.force, **options):
+        counts[result['status']] += 1
+        if result['status'] == 'compressed':
+            input_bytes += result['input_size']
+            output_bytes += result['output_size']
+        elif result['status'] == 'failed':
+            print(f"failed: {result['src']}: {result['error']}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    print("\n批量压缩结果:")
+    print("-" * 50)
+    print(f"压缩: {counts['compressed']}  跳过: {counts['skipped']}  失败: {counts['failed']}")
+    print(f"耗时: {elapsed:.2f} s")
+    if counts['compressed']:
+        print(f"吞吐: {counts['compressed'] / elapsed:.1f} 张/s, "
+              f"{input_bytes / 1024 / 1024 / elapsed:.2f} MB/s")
+        print(f"原始大小: {input_bytes / 1024 / 1024:.2f} MB")
+        print(f"压缩后大小: {output_bytes / 1024 / 1024:.2f} MB")
+        print(f"节省: {(input_bytes - output_bytes) / input_bytes * 100:.2f}%")
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from legacy import LegacyPNGCompressor
+from png_compressor import PNGCompressor
+
+compressors = {
+    'legacy': LegacyPNGCompressor,
+    'numpy': PNGCompressor,
+}
+
+
+def synthetic_image(width, height, seed=0):
+    """生成RGBA测试图：渐变加噪声，带若干半透明的圆形区域"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[..., 0] = (x / width * 255).astype(np.uint8)
+    rgba[..., 1] = (y / height * 255).astype(np.uint8)
+    rgba[..., 2] = rng.integers(0, 64, (height, width), dtype=np.uint8) + 128
+    rgba[..., 3] = 255
+    for _ in range(8):
+        cx, cy = rng.integers(0, width), rng.integers(0, height)
+        r = rng.integers(min(width, height) // 20, min(width, height) // 6)
+        inside = (x - cx) ** 2 + (y - cy) ** 2 < r * r
+        rgba[..., 3][inside] = rng.integers(0, 200)
+    return Image.fromarray(rgba, 'RGBA')
+
+
+def run(name, path):
+    """在独立进程中运行，峰值RSS只包含本次转换"""
+    image = Image.open(path)
+    image.load()
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    start = time.perf_counter()
+    converted = compressors[name]().convert_to_8bit(image)
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    digest = hashlib.sha256(converted.tobytes()).hexdigest()
+    return elapsed, peak_rss - base_rss, digest
+
+
+def run_compress(name, path, out_path):
+    """完整压缩（读取、转换、编码、写文件）的耗时与峰值RSS，包含源图解码；name 为 numpy 或 tiled"""
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    start = time.perf_counter()
+    result = PNGCompressor().compress(path, out_path, tiled=name == 'tiled')
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return elapsed, peak_rss - base_rss, result['compressed_size']
+
+
+def compare_compress(path, tmp_dir, mp):
+    print(f"{'path':<8} {'seconds':>9} {'MP/s':>8} {'extra RSS MB':>13} {'output KB':>10}")
+    for name in ('numpy', 'tiled'):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            elapsed, extra_rss, size = executor.submit(
+                run_compress, name, path, os.path.join(tmp_dir, f'{name}.png')
+            ).result()
+        throughput = f"{mp / elapsed:8.1f}" if mp else ''
+        print(f"{name:<8} {elapsed:9.3f} {throughput:>8} {extra_rss:13.1f} {size / 1024:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比 convert_to_8bit 的原实现与 NumPy 实现")
+    parser.add_argument('--width', type=int, default=5472)
+    parser.add_argument('--height', type=int, default=3648)
+    parser.add_argument('--image', help="使用指定的图片而不是生成的测试图")
+    parser.add_argument('--paths', nargs='+', choices=list(compressors), default=list(compressors))
+    parser.add_argument('--compress', action='store_true',
+                        help="对比完整压缩与分块压缩（tiled.py）的耗时和峰值内存")
+    args = parser.parse_args()
+    Image.MAX_IMAGE_PIXELS = None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.image
+        if path is None:
+            path = os.path.join(tmp_dir, 'synthetic.png')
+            synthetic_image(args.width, args.height).save(path, compress_level=1)
+        with Image.open(path) as image:
+            print(f"image: {image.size[0]}x{image.size[1]} {image.mode}, "
+                  f"{image.size[0] * image.size[1] / 1e6:.1f} MP")
+
+        if args.compress:
+            mp = args.width * args.height / 1e6 if args.image is None else 0
+            compare_compress(path, tmp_dir, mp)
+            return
+
+        print(f"{'path':<8} {'seconds':>9} {'MP/s':>8} {'extra RSS MB':>13}")
+        digests = {}
+        for name in args.paths:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                elapsed, extra_rss, digests[name] = executor.submit(run, name, path).result()
+            mp = args.width * args.height / 1e6 if args.image is None else 0
+            throughput = f"{mp / elapsed:8.1f}" if mp else ''
+            print(f"{name:<8} {elapsed:9.3f} {throughput:>8} {extra_rss:13.1f}")
+
+        # 两条路径的调色板索引应完全相同（调色板只在索引254处不同，见 README）
+        if len(set(digests.values())) > 1:
+            raise SystemExit("palette indices differ between paths")
+
+
+if __name__ == '__main__':
+    main()
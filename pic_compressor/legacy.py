@@ -0,0 +1,54 @@
+import numpy as np
+from PIL import Image
+
+from png_compressor import PNGCompressor
+
+
+class LegacyPNGCompressor(PNGCompressor):
+    """原来的 convert_to_8bit，供 benchmark.py 对比耗时、内存与输出"""
+
+    def convert_to_8bit(self, image):
+        """将图像转换为8位调色板模式，保留透明度和颜色"""
+        if image.mode == 'RGBA':
+            # 获取alpha通道
+            alpha = image.split()[3]
+            
+            # 二值化alpha通道
+            mask = Image.eval(alpha, lambda a: 0 if a < 128 else 255)
+            
+            # 保留原始RGB颜色，只修改alpha通道
+            image_array = np.array(image)
+            image_array[..., 3] = np.array(mask)
+            
+            # 创建一个临时的RGB图像用于量化
+            rgb_image = Image.fromarray(image_array[..., :3], 'RGB')
+            
+            # 使用中位切分法进行颜色量化，保留更多颜色细节
+            converted = rgb_image.quantize(colors=255, method=2)
+            
+            # 获取量化后的调色板
+            palette = converted.getpalette()
+            
+            # 创建新的调色板图像
+            final_image = converted.copy()
+            
+            # 设置透明像素
+            alpha_mask = np.array(mask) == 0
+            if np.any(alpha_mask):
+                # 将透明像素的索引设为255
+                img_data = np.array(final_image)
+                img_data[alpha_mask] = 255
+                final_image = Image.fromarray(img_data)
+                
+                # 确保调色板的最后一个颜色是透明的
+                if palette:
+                    # 保持最后一个颜色接近原图中透明区域的颜色
+                    transparent_color = image_array[alpha_mask][0][:3] if len(image_array[alpha_mask]) > 0 else [0, 0, 0]
+                    palette[-3:] = transparent_color
+                    final_image.putpalette(palette)
+                    final_image.info['transparency'] = 255
+            
+            return final_image
+        else:
+            # 直接转换为8位调色板模式，使用中位切分法
+            return image.quantize(colors=256, method=2)
@@ -1,74 +1,180 @@
+import io
+import time
+
 import numpy as np
-from PIL import Image
+from PIL import Image, features
 import os
 
+from tiled import compress_tiled
+
 class PNGCompressor:
+    # 调参模式的搜索空间：颜色数（None 为默认的255/256色）、量化方法与是否抖动
+    tune_colors = (None, 128, 64, 32, 16, 8)
+    tune_methods = (Image.Quantize.FASTOCTREE, Image.Quantize.MEDIANCUT, Image.Quantize.MAXCOVERAGE)
+    if features.check_feature('libimagequant'):
+        tune_methods += (Image.Quantize.LIBIMAGEQUANT,)
+
+    # 默认的保存参数，以及调参模式尝试的其他编码参数；
+    # Pillow 不能指定每行的PNG过滤器，可调的是 optimize、zlib 压缩级别与压缩策略（compress_type）
+    save_params = {'optimize': True, 'compress_level': 9}
+    tune_save_params = (
+        {'compress_level': 9, 'compress_type': 1},  # Z_FILTERED
+        {'compress_level': 9, 'compress_type': 3},  # Z_RLE
+        {'compress_level': 9, 'compress_type': 4},  # Z_FIXED
+        {'compress_level': 6},
+    )
+
     def __init__(self):
         pass
 
-    def convert_to_8bit(self, image):
-        """将图像转换为8位调色板模式，保留透明度和颜色"""
+    def _quantize(self, image, colors, method, dither):
+        converted = image.quantize(colors=colors, method=method)
+        if dither:
+            # quantize 只在指定调色板时抖动：先得到调色板，再用Floyd-Steinberg抖动映射一次
+            converted = image.quantize(palette=converted, dither=Image.Dither.FLOYDSTEINBERG)
+        return converted
+
+    def convert_to_8bit(self, image, colors=None, method=Image.Quantize.FASTOCTREE, dither=False):
+        """将图像转换为8位调色板模式，保留透明度和颜色
+
+        colors 默认为255色（RGBA，另留1个透明色）或256色；透明色的索引为 colors，
+        颜色数较少时调色板随之变短，保存时可使用更低的位深
+        """
         if image.mode == 'RGBA':
-            # 获取alpha通道
-            alpha = image.split()[3]
-            
-            # 二值化alpha通道
-            mask = Image.eval(alpha, lambda a: 0 if a < 128 else 255)
-            
-            # 保留原始RGB颜色，只修改alpha通道
-            image_array = np.array(image)
-            image_array[..., 3] = np.array(mask)
-            
-            # 创建一个临时的RGB图像用于量化
-            rgb_image = Image.fromarray(image_array[..., :3], 'RGB')
-            
-            # 使用中位切分法进行颜色量化，保留更多颜色细节
-            converted = rgb_image.quantize(colors=255, method=2)
-            
-            # 获取量化后的调色板
-            palette = converted.getpalette()
-            
-            # 创建新的调色板图像
-            final_image = converted.copy()
-            
-            # 设置透明像素
-            alpha_mask = np.array(mask) == 0
-            if np.any(alpha_mask):
-                # 将透明像素的索引设为255
-                img_data = np.array(final_image)
-                img_data[alpha_mask] = 255
-                final_image = Image.fromarray(img_data)
-                
-                # 确保调色板的最后一个颜色是透明的
-                if palette:
-                    # 保持最后一个颜色接近原图中透明区域的颜色
-                    transparent_color = image_array[alpha_mask][0][:3] if len(image_array[alpha_mask]) > 0 else [0, 0, 0]
-                    palette[-3:] = transparent_color
-                    final_image.putpalette(palette)
-                    final_image.info['transparency'] = 255
-            
+            colors = colors or 255
+
+            # RGB颜色直接在PIL中转换并量化，索引0~colors-1；
+            # 临时的RGB图像在量化后立即释放
+            converted = self._quantize(image.convert('RGB'), colors, method, dither)
+
+            # 只取出alpha通道（每像素1字节），用NumPy一次比较得到透明像素的掩码
+            transparent = np.asarray(image.getchannel('A')) < 128
+
+            if not transparent.any():
+                return converted
+
+            # 量化结果复制一次为可写的索引数组，透明像素原地改为透明色的索引
+            indices = np.array(converted)
+            np.copyto(indices, colors, where=transparent)
+            final_image = Image.fromarray(indices)
+
+            # 调色板补齐到 colors 色，再追加透明色，取原图中第一个透明像素的颜色
+            palette = converted.getpalette()[:colors * 3]
+            palette += [0] * (colors * 3 - len(palette))
+            y, x = divmod(int(transparent.argmax()), image.width)
+            palette += list(image.getpixel((x, y))[:3])
+            final_image.putpalette(palette)
+            final_image.info['transparency'] = colors
+
             return final_image
-        else:
-            # 直接转换为8位调色板模式，使用中位切分法
+        elif colors is None and method == Image.Quantize.FASTOCTREE and not dither:
+            # 直接转换为8位调色板模式
             return image.quantize(colors=256, method=2)
+        else:
+            return self._quantize(image.convert('RGB'), colors or 256, method, dither)
+
+    def psnr(self, image, converted):
+        """原图与调色板图像在不透明像素上的RGB峰值信噪比（dB），按行分块计算以限制内存"""
+        squared_error = 0.0
+        count = 0
+        band = max(1, (1 << 20) // image.width)
+        for top in range(0, image.height, band):
+            box = (0, top, image.width, min(top + band, image.height))
+            reference = np.asarray(image.crop(box).convert('RGB'), dtype=np.int16)
+            output = np.asarray(converted.crop(box).convert('RGB'), dtype=np.int16)
+            diff = reference - output
+            if image.mode == 'RGBA':
+                diff = diff[np.asarray(image.crop(box).getchannel('A')) >= 128]
+            squared_error += float(np.square(diff, dtype=np.int32).sum())
+            count += diff.size
+        if count == 0 or squared_error == 0:
+            return float('inf')
+        return float(10 * np.log10(255 ** 2 / (squared_error / count)))
+
+    def _encode(self, image, params):
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG', **params)
+        return buffer.getvalue()
+
+    def tune(self, image, min_psnr=40.0, time_budget=2.0):
+        """在PSNR不低于 min_psnr 的前提下搜索输出最小的参数，返回 (图像, PNG字节, 参数)
+
+        先用默认参数得到基准结果（无论PSNR多少都可作为结果），再依次尝试更少的颜色、
+        其他量化方法与抖动，最后对选中的结果尝试其他编码参数；所有编码都在内存中完成。
+        每次尝试前检查 time_budget（秒），超时即停止，只有正在进行的一次尝试会超出预算。
+        """
+        deadline = time.perf_counter() + time_budget
+        image.load()
+
+        best_image = self.convert_to_8bit(image)
+        best_data = self._encode(best_image, self.save_params)
+        best_params = {'colors': None, 'method': 2, 'dither': False, 'psnr': self.psnr(image, best_image)}
 
-    def compress(self, input_path, output_path=None):
+        for colors in self.tune_colors:
+            passed = False
+            for method in self.tune_methods:
+                for dither in (False, True):
+                    if colors is None and method == Image.Quantize.FASTOCTREE and not dither:
+                        continue  # 即基准结果
+                    if time.perf_counter() > deadline:
+                        break
+                    try:
+                        converted = self.convert_to_8bit(image, colors, method, dither)
+                    except ValueError:
+                        continue  # 该模式不支持的量化方法
+                    quality = self.psnr(image, converted)
+                    if quality < min_psnr:
+                        continue
+                    passed = True
+                    data = self._encode(converted, self.save_params)
+                    if len(data) < len(best_data):
+                        best_image, best_data = converted, data
+                        best_params = {'colors': colors, 'method': int(method), 'dither': dither, 'psnr': quality}
+            # 这个颜色数下没有满足质量要求的结果，更少的颜色也不会满足
+            if not passed and colors is not None:
+                break
+
+        best_params.update(self.save_params)
+        for params in self.tune_save_params:
+            if time.perf_counter() > deadline:
+                break
+            data = self._encode(best_image, params)
+            if len(data) < len(best_data):
+                best_data = data
+                best_params = {k: best_params[k] for k in ('colors', 'method', 'dither', 'psnr')}
+                best_params.update(params)
+
+        return best_image, best_data, best_params
+
+    def compress(self, input_path, output_path=None, tune=False, min_psnr=40.0, time_budget=2.0,
+                 tiled=False, tile_rows=256):
         """
         使用8位调色板模式压缩PNG图像，保持透明度和颜色质量
+        tune=True 时在质量下限与时间预算内搜索输出最小的参数，见 tune
+        tiled=True 时按条带处理超大图片，内存占用有上限，见 tiled.py
         """
         if output_path is None:
             filename, ext = os.path.splitext(input_path)
             output_path = f"{filename}_compressed{ext}"
 
+        if tiled:
+            return dict(compress_tiled(input_path, output_path, tile_rows=tile_rows), params=None)
+
         # 加载图像
         image = Image.open(input_path)
         original_size = image.size
         
-        # 转换为8位调色板模式
-        image = self.convert_to_8bit(image)
-        
-        # 保存为PNG，使用最大压缩
-        image.save(output_path, 'PNG', optimize=True, compress_level=9)
+        params = None
+        if tune:
+            image, data, params = self.tune(image, min_psnr, time_budget)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+        else:
+            # 转换为8位调色板模式
+            image = self.convert_to_8bit(image)
+
+            # 保存为PNG，使用最大压缩
+            image.save(output_path, 'PNG', **self.save_params)
         
         # 验证尺寸没有改变
         if image.size != original_size:
@@ -84,7 +190,8 @@ class PNGCompressor:
             'compressed_size': compressed_file_size,
             'compression_ratio': compression_ratio,
             'image_size': image.size,
-            'mode': image.mode
+            'mode': image.mode,
+            'params': params
         }
 
 if __name__ == '__main__':
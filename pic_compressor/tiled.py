@@ -0,0 +1,362 @@
+"""超大图片的分块压缩，内存占用与图片尺寸无关
+
+    python tiled.py huge.png -o huge_compressed.png --tile-rows 256
+
+1. 逐条带解码源PNG（PNGBands），每隔若干行、若干列采样，生成全局调色板（默认最多采样约100万像素）
+2. 再解码一遍，按水平条带把像素映射到调色板，索引按行顺序写入磁盘上的临时文件（每像素1字节）
+3. 自己写PNG：IHDR / PLTE / tRNS 之后逐行从临时文件读出索引，经 zlib.compressobj 流式写入IDAT
+
+透明色要扫描完所有像素才能确定，而PLTE必须写在IDAT之前，所以先完整映射到临时文件再编码。
+临时文件用普通读写而不是 memmap：映射的页面会计入进程的常驻内存，随图片尺寸增长。
+源图不会被完整解码：任何时刻内存中只有一个条带。16位、隔行扫描的PNG和其他格式
+退回 Pillow 整图解码后再分条带处理，这时源图本身仍会占用与尺寸成正比的内存。
+"""
+import argparse
+import io
+import math
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+IDAT_SIZE = 1 << 16
+
+# PNG 颜色类型 -> 每像素的样本数
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# 反过滤只与每像素字节数（bpp）有关：按 bpp 选一种8位格式，让 Pillow 把扫描行还原为原始字节
+RAW_FORMATS = {1: ('L', 0), 2: ('LA', 4), 3: ('RGB', 2), 4: ('RGBA', 6)}
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def _read_chunk(f):
+    header = f.read(8)
+    if len(header) < 8:
+        raise ValueError("truncated PNG")
+    length, kind = struct.unpack('>I4s', header)
+    data = f.read(length)
+    crc, = struct.unpack('>I', f.read(4))
+    if len(data) < length or zlib.crc32(data, zlib.crc32(kind)) != crc:
+        raise ValueError(f"corrupt PNG chunk {kind!r}")
+    return kind, data
+
+
+class PNGBands:
+    """逐条带解码非隔行、位深不超过8的PNG，不会一次解码整张图
+
+    IDAT 用 zlib.decompressobj 流式解压；每个条带的扫描行（带过滤器字节）包装成一个只有
+    这些行的8位PNG交给 Pillow 反过滤（Paeth 等过滤器依赖左侧像素，在Python中逐像素计算太慢），
+    上一条带的最后一行以过滤器 None 放在最前面，作为本条带第一行的上一行。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.palette = None
+        self.transparency = None
+        with open(path, 'rb') as f:
+            if f.read(8) != PNG_SIGNATURE:
+                raise ValueError("not a PNG file")
+            kind, data = _read_chunk(f)
+            if kind != b'IHDR':
+                raise ValueError("PNG does not start with IHDR")
+            (self.width, self.height, self.bit_depth, self.color_type,
+             _, _, self.interlace) = struct.unpack('>IIBBBBB', data)
+            while True:
+                offset = f.tell()
+                kind, data = _read_chunk(f)
+                if kind == b'PLTE':
+                    self.palette = np.zeros((256, 3), dtype=np.uint8)
+                    colors = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+                    self.palette[:len(colors)] = colors
+                elif kind == b'tRNS':
+                    self.transparency = data
+                elif kind in (b'IDAT', b'IEND'):
+                    self.idat_offset = offset
+                    break
+        self.channels = CHANNELS[self.color_type]
+        self.row_bytes = math.ceil(self.width * self.channels * self.bit_depth / 8)
+        self.bpp = max(1, self.channels * self.bit_depth // 8)
+
+    @property
+    def supported(self):
+        return self.interlace == 0 and self.bit_depth <= 8
+
+    @property
+    def has_alpha(self):
+        return self.color_type in (4, 6) or self.transparency is not None
+
+    def _scanlines(self, band_bytes):
+        # 按条带产出解压后的扫描行，decompress 的 max_length 保证输出不超过一个条带
+        decompressor = zlib.decompressobj()
+        buffer = bytearray()
+        with open(self.path, 'rb') as f:
+            f.seek(self.idat_offset)
+            while True:
+                kind, data = _read_chunk(f)
+                if kind == b'IEND':
+                    break
+                if kind != b'IDAT':
+                    continue
+                while data:
+                    buffer += decompressor.decompress(data, band_bytes - len(buffer))
+                    data = decompressor.unconsumed_tail
+                    if len(buffer) == band_bytes:
+                        yield bytes(buffer)
+                        buffer.clear()
+        buffer += decompressor.flush()
+        if buffer:
+            yield bytes(buffer)
+
+    def _unfilter(self, data, prior):
+        rows = len(data) // (self.row_bytes + 1)
+        if prior is not None:
+            data = b'\x00' + prior + data
+            rows += 1
+        mode, color_type = RAW_FORMATS[self.bpp]
+        f = io.BytesIO()
+        f.write(PNG_SIGNATURE)
+        _chunk(f, b'IHDR', struct.pack('>IIBBBBB', self.row_bytes // self.bpp, rows, 8, color_type, 0, 0, 0))
+        _chunk(f, b'IDAT', zlib.compress(data, 0))
+        _chunk(f, b'IEND', b'')
+        f.seek(0)
+        with Image.open(f) as band:
+            raw = np.asarray(band).reshape(rows, self.row_bytes)
+        return raw[1:] if prior is not None else raw
+
+    def _pixels(self, raw):
+        """原始扫描行 -> (RGB数组, 透明像素掩码或 None)"""
+        rows = raw.shape[0]
+        if self.bit_depth < 8:
+            bits = np.unpackbits(raw, axis=1).reshape(rows, -1, self.bit_depth)
+            weights = 1 << np.arange(self.bit_depth - 1, -1, -1, dtype=np.uint8)
+            samples = (bits * weights).sum(axis=2, dtype=np.uint8)[:, :self.width, None]
+        else:
+            samples = raw.reshape(rows, self.width, self.channels)
+
+        transparent = None
+        if self.color_type == 3:
+            indices = samples[..., 0]
+            rgb = self.palette[indices]
+            if self.transparency is not None:
+                alpha = np.full(256, 255, dtype=np.uint8)
+                alpha[:len(self.transparency)] = np.frombuffer(self.transparency, dtype=np.uint8)
+                transparent = alpha[indices] < 128
+            return rgb, transparent
+
+        if self.color_type in (0, 4):
+            gray = samples[..., 0]
+            if self.color_type == 0 and self.transparency is not None:
+                transparent = gray == struct.unpack('>H', self.transparency[:2])[0]
+            if self.bit_depth < 8:
+                gray = gray * (255 // ((1 << self.bit_depth) - 1))
+            rgb = np.repeat(gray[..., None], 3, axis=2)
+        else:
+            rgb = np.ascontiguousarray(samples[..., :3])
+            if self.color_type == 2 and self.transparency is not None:
+                key = np.array(struct.unpack('>3H', self.transparency[:6]))
+                transparent = (samples == key).all(axis=2)
+        if self.color_type in (4, 6):
+            transparent = samples[..., -1] < 128
+        return rgb, transparent
+
+    def bands(self, tile_rows=256):
+        """按顺序产出 (top, RGB数组, 透明像素掩码或 None)，每个条带 tile_rows 行"""
+        prior = None
+        top = 0
+        for data in self._scanlines(tile_rows * (self.row_bytes + 1)):
+            raw = self._unfilter(data, prior)
+            prior = raw[-1].tobytes()
+            rgb, transparent = self._pixels(raw)
+            yield top, rgb, transparent
+            top += raw.shape[0]
+        if top != self.height:
+            raise ValueError(f"truncated PNG: {top} of {self.height} rows")
+
+
+class PillowBands:
+    """其他格式以及16位、隔行扫描的PNG：Pillow 整图解码后按条带产出，接口与 PNGBands 相同"""
+
+    def __init__(self, path):
+        self.image = Image.open(path)
+        self.width, self.height = self.image.size
+        self.has_alpha = has_alpha(self.image)
+
+    def bands(self, tile_rows=256):
+        for top in range(0, self.height, tile_rows):
+            box = (0, top, self.width, min(top + tile_rows, self.height))
+            band = np.asarray(self.image.crop(box).convert('RGBA' if self.has_alpha else 'RGB'))
+            transparent = band[..., 3] < 128 if self.has_alpha else None
+            yield top, np.ascontiguousarray(band[..., :3]), transparent
+
+
+def open_bands(path):
+    try:
+        source = PNGBands(path)
+        if source.supported:
+            return source
+    except ValueError:
+        pass
+    return PillowBands(path)
+
+
+def build_palette(source, colors=None, sample_pixels=1 << 20, tile_rows=256,
+                  method=Image.Quantize.FASTOCTREE):
+    """逐条带解码一遍，每隔 stride 行、stride 列取一个像素，量化后返回调色板图像（P模式）
+
+    取的是原图中真实存在的颜色，不会像平均缩小那样产生边缘的混合色
+    """
+    # 有透明像素时留一个索引给透明色（索引 len(palette)），否则 colors=256 时索引超出 uint8
+    limit = 255 if source.has_alpha else 256
+    colors = limit if colors is None else min(colors, limit)
+    stride = max(1, math.ceil((source.width * source.height / sample_pixels) ** 0.5))
+    samples = []
+    for top, rgb, _ in source.bands(tile_rows):
+        first = -top % stride
+        # 复制出采样的像素，切片视图会让整个条带一直留在内存中
+        samples.append(rgb[first::stride, ::stride].copy())
+    sample = Image.fromarray(np.concatenate(samples), 'RGB')
+    return sample.quantize(colors=colors, method=method)
+
+
+def map_tiles(source, palette_image, out, tile_rows=256):
+    """逐个条带把像素映射到调色板，索引按行顺序写入二进制文件 out（每像素1字节）
+
+    透明像素（alpha < 128）写为索引 len(palette)，返回第一个透明像素的RGB，没有透明像素时为 None
+    """
+    transparent_index = len(palette_image.getpalette()) // 3
+    transparent_color = None
+    for top, rgb, transparent in source.bands(tile_rows):
+        mapped = Image.fromarray(rgb, 'RGB').quantize(palette=palette_image, dither=Image.Dither.NONE)
+        rows = np.array(mapped)
+        if transparent is not None and transparent.any():
+            np.copyto(rows, transparent_index, where=transparent)
+            if transparent_color is None:
+                y, x = divmod(int(transparent.argmax()), source.width)
+                transparent_color = tuple(int(c) for c in rgb[y, x])
+        out.write(rows.tobytes())
+    return transparent_color
+
+
+def read_rows(f, width, height):
+    """从 map_tiles 写出的文件中逐行读出索引"""
+    for _ in range(height):
+        row = f.read(width)
+        if len(row) < width:
+            raise ValueError("truncated index file")
+        yield row
+
+
+def _chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+
+def write_png(f, rows, width, height, palette, transparent_index=None, compress_level=9):
+    """把8位索引图流式写为PNG
+
+    rows 按顺序产出每一行的索引（bytes，width 字节）；palette 为扁平的 [r, g, b, ...]；transparent_index 不为 None 时写出 tRNS，该索引完全透明。
+    每行使用过滤器 None（调色板图像的推荐做法），压缩后的数据每满 IDAT_SIZE 字节写出一个IDAT块
+    """
+    f.write(PNG_SIGNATURE)
+    _chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0))
+    _chunk(f, b'PLTE', bytes(palette))
+    if transparent_index is not None:
+        _chunk(f, b'tRNS', b'\xff' * transparent_index + b'\x00')
+
+    compressor = zlib.compressobj(compress_level)
+    pending = []
+    pending_size = 0
+    for row in rows:
+        # 每行以过滤器字节开头，一起送入压缩器
+        data = compressor.compress(b'\x00' + row)
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= IDAT_SIZE:
+            _chunk(f, b'IDAT', b''.join(pending))
+            pending, pending_size = [], 0
+    pending.append(compressor.flush())
+    _chunk(f, b'IDAT', b''.join(pending))
+    _chunk(f, b'IEND', b'')
+
+
+def compress_tiled(input_path, output_path=None, colors=None, tile_rows=256,
+                   sample_pixels=1 << 20, compress_level=9, work_dir=None):
+    """分块压缩一张图片，先写入同目录的临时文件再 os.replace；返回与 PNGCompressor.compress 相同的信息"""
+    if output_path is None:
+        filename, ext = os.path.splitext(input_path)
+        output_path = f"{filename}_compressed{ext}"
+
+    source = open_bands(input_path)
+    palette_image = build_palette(source, colors, sample_pixels, tile_rows)
+    palette = palette_image.getpalette()
+
+    with tempfile.TemporaryFile(dir=work_dir) as indices:
+        transparent_color = map_tiles(source, palette_image, indices, tile_rows)
+        indices.seek(0)
+
+        transparent_index = None
+        if transparent_color is not None:
+            transparent_index = len(palette) // 3
+            palette = palette + list(transparent_color)
+
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(output_path), suffix='.tmp',
+                                        dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                rows = read_rows(indices, source.width, source.height)
+                write_png(f, rows, source.width, source.height, palette, transparent_index, compress_level)
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    original_file_size = os.path.getsize(input_path)
+    compressed_file_size = os.path.getsize(output_path)
+    return {
+        'original_size': original_file_size,
+        'compressed_size': compressed_file_size,
+        'compression_ratio': (original_file_size - compressed_file_size) / original_file_size * 100,
+        'image_size': (source.width, source.height),
+        'mode': 'P'
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分块压缩超大PNG图片")
+    parser.add_argument('input')
+    parser.add_argument('-o', '--output')
+    parser.add_argument('--tile-rows', type=int, default=256, help="每个条带的行数")
+    parser.add_argument('--sample-pixels', type=int, default=1 << 20, help="生成调色板时采样的像素数")
+    parser.add_argument('--work-dir', help="索引临时文件所在目录，默认为系统临时目录")
+    args = parser.parse_args()
+
+    Image.MAX_IMAGE_PIXELS = None  # 本模式就是为超大图片准备的
+    start = time.perf_counter()
+    result = compress_tiled(args.input, args.output, tile_rows=args.tile_rows,
+                            sample_pixels=args.sample_pixels, work_dir=args.work_dir)
+    print("\n压缩结果:")
+    print("-" * 50)
+    print(f"原始大小: {result['original_size']/1024:.2f} KB")
+    print(f"压缩后大小: {result['compressed_size']/1024:.2f} KB")
+    print(f"压缩率: {result['compression_ratio']:.2f}%")
+    print(f"图像尺寸: {result['image_size']}")
+    print(f"耗时: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+"""把 expr2dsl 与 re_parser 作为 HTTP 服务提供，只依赖标准库 asyncio
+
+    python server.py --port 8080
+
+    POST /expr2dsl          {"query": "...", "fields": [...], "optimized": false}
+    POST /expr2dsl/batch    {"queries": ["...", ...], "fields": [...], "optimized": false}
+    POST /re_parser         {"query": "..."}
+    POST /re_parser/batch   {"queries": ["...", ...]}
+    GET  /metrics           各接口的延迟直方图与缓存命中情况
+    GET  /health
+
+单条查询返回 {"dsl": ...}，解析失败返回 400 与 {"error": ...}；
+批量接口按输入顺序返回 {"results": [{"dsl": ...} 或 {"error": ...}, ...]}，单条失败不影响其他查询。
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# 两个项目都是平铺的脚本目录，没有打包；re_parser 在前。
+# 共用的 QueryCache 只有 expr2dsl/python/query_cache.py 一份
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(_ROOT, "re_parser"))
+sys.path.append(os.path.join(_ROOT, "expr2dsl", "python"))
+
+from main import QueryParser, build_inline_parser, build_parser
+from parser import parse_query
+from query_cache import QueryCache
+
+
+MAX_BODY = 8 << 20
+
+MAX_BATCH = 10000
+
+MAX_FIELDS = 64
+
+# 按 (fields, optimized) 保留的 QueryParser 个数，超出时淘汰最久未用的
+MAX_PARSERS = 64
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图（毫秒），分位数取所在桶的上界"""
+
+    BOUNDS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def observe(self, ms, error=False):
+        self.buckets[bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.errors += error
+        self.total += ms
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.BOUNDS + (float("inf"),), self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        labels = [f"le_{b}" for b in self.BOUNDS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class QueryService:
+
+    def __init__(self, default_fields=None, cache_size=4096, threads=None):
+
+        self.default_fields = default_fields or ["title", "keywords"]
+        self.expr_cache = QueryCache(cache_size)
+        self.re_cache = QueryCache(cache_size)
+        self.parsers = OrderedDict()  # (fields, optimized) -> QueryParser，LRU
+        self.histograms = {}
+        # 批量请求在线程池中解析，事件循环在此期间仍可接受其他连接
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+        self.routes = {
+            ("POST", "/expr2dsl"): self.expr2dsl,
+            ("POST", "/expr2dsl/batch"): self.expr2dsl_batch,
+            ("POST", "/re_parser"): self.re_parser,
+            ("POST", "/re_parser/batch"): self.re_parser_batch,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/health"): self.health,
+        }
+
+    def warm_up(self):
+
+        # 启动时生成 LALR 解析表并走一遍两条解析路径，第一个请求不再承担这些开销
+        build_parser()
+        build_inline_parser()
+        self._expr_parser(None, False).parse('a AND (b OR "c d") AND F:[1 TO 2]')
+        parse_query("(ti,abst=car and date>2020) not origin=korea")
+        self.expr_cache.clear()
+
+    # -------- 解析 --------
+
+    def _expr_parser(self, fields, optimized):
+
+        key = (tuple(_fields(fields) or self.default_fields), bool(optimized))
+        parser = self.parsers.get(key)
+        if parser is None:
+            # inline 模式的结果与两阶段相同，长查询占用的内存更少
+            parser = QueryParser(
+                list(key[0]), cache=self.expr_cache, optimized=key[1], inline=True
+            )
+            self.parsers[key] = parser
+            while len(self.parsers) > MAX_PARSERS:
+                self.parsers.popitem(last=False)
+        else:
+            self.parsers.move_to_end(key)
+        return parser
+
+    def _parse_many(self, parse, queries):
+
+        results = []
+        for query in queries:
+            try:
+                results.append({"dsl": parse(query)})
+            except Exception as e:
+                results.append({"error": f"{type(e).__name__}: {e}"})
+        return results
+
+    # -------- 接口 --------
+
+    async def expr2dsl(self, body):
+
+        parser = self._expr_parser(body.get("fields"), body.get("optimized"))
+        return {"dsl": parser.parse(_query(body))}
+
+    async def expr2dsl_batch(self, body):
+
+        parser = self._expr_parser(body.get("fields"), body.get("optimized"))
+        queries = _queries(body)
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            self.executor, self._parse_many, parser.parse, queries
+        )
+        return {"results": results}
+
+    async def re_parser(self, body):
+
+        return {"dsl": parse_query(_query(body), self.re_cache)}
+
+    async def re_parser_batch(self, body):
+
+        queries = _queries(body)
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            self.executor,
+            self._parse_many,
+            lambda q: parse_query(q, self.re_cache),
+            queries,
+        )
+        return {"results": results}
+
+    async def metrics(self, body):
+
+        return {
+            "endpoints": {
+                path: histogram.to_dict()
+                for path, histogram in sorted(self.histograms.items())
+            },
+            "cache": {
+                "expr2dsl": self.expr_cache.stats(),
+                "re_parser": self.re_cache.stats(),
+            },
+        }
+
+    async def health(self, body):
+
+        return {"status": "ok"}
+
+    # -------- HTTP --------
+
+    async def dispatch(self, method, path, raw):
+
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in self.routes):
+                raise HttpError(405, f"{method} not allowed on {path}")
+            raise HttpError(404, f"no route for {path}")
+
+        body = {}
+        if method == "POST":
+            try:
+                body = json.loads(raw or b"{}")
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise HttpError(400, f"invalid JSON: {e}")
+            if not isinstance(body, dict):
+                raise HttpError(400, "expected a JSON object")
+
+        try:
+            return await handler(body)
+        except HttpError:
+            raise
+        except Exception as e:
+            # 单条查询的语法错误
+            raise HttpError(400, f"{type(e).__name__}: {e}")
+
+    async def handle(self, reader, writer):
+
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, raw = request
+
+                start = perf_counter()
+                status = 200
+                try:
+                    payload = await self.dispatch(method, path, raw)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                ms = (perf_counter() - start) * 1000
+
+                if (method, path) in self.routes and path != "/metrics":
+                    histogram = self.histograms.get(path)
+                    if histogram is None:
+                        histogram = self.histograms[path] = LatencyHistogram()
+                    histogram.observe(ms, status != 200)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except HttpError as e:
+            await _write_response(writer, e.status, {"error": str(e)}, False)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _query(body):
+
+    query = body.get("query")
+    if not isinstance(query, str):
+        raise HttpError(400, "'query' must be a string")
+    return query
+
+
+def _fields(fields):
+
+    if fields is None:
+        return None
+    if (
+        not isinstance(fields, list)
+        or not fields
+        or not all(isinstance(f, str) and f for f in fields)
+    ):
+        raise HttpError(400, "'fields' must be a non-empty list of strings")
+    if len(fields) > MAX_FIELDS:
+        raise HttpError(400, f"at most {MAX_FIELDS} fields")
+    return fields
+
+
+def _queries(body):
+
+    queries = body.get("queries")
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        raise HttpError(400, "'queries' must be a list of strings")
+    if len(queries) > MAX_BATCH:
+        raise HttpError(413, f"at most {MAX_BATCH} queries per batch")
+    return queries
+
+
+async def _read_request(reader):
+
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HttpError(400, "invalid Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, f"body larger than {MAX_BODY} bytes")
+    raw = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, raw
+
+
+async def _write_response(writer, status, payload, keep_alive):
+
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(host, port, service):
+
+    server = await asyncio.start_server(service.handle, host, port)
+    addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"serving on {addresses}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description="查询到 DSL 的 HTTP 服务")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--fields", nargs="+", help="expr2dsl 的默认检索字段")
+    arg_parser.add_argument("--cache-size", type=int, default=4096)
+    arg_parser.add_argument("--threads", type=int, help="批量解析的线程数")
+    args = arg_parser.parse_args()
+
+    service = QueryService(args.fields, args.cache_size, args.threads)
+    service.warm_up()
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,55 @@
+from typing import List, Optional
+
+from expr2dsl.query_ast import And, EsBackend, JsonBackend, Node, Not, Or, Range, SqlBackend, Term
+from parser import SearchParser
+
+
+class AstSearchParser(SearchParser):
+    """ 语法与 SearchParser 相同，parse() 返回 query_ast 节点而不是 DSL 字典
+    a not b 表示为 And(a, Not(b))，连续的 and / or 合并为一个 n 元节点
+    """
+
+    def parse(self) -> Node:
+        result = self._parse_expression()
+        if self.parentheses_count > 0:
+            raise ValueError("Unmatched opening parenthesis")
+        self._expect_end()
+        return result
+
+    def _make_and(self, left: Node, right: Node) -> Node:
+        return And.of(left, right)
+
+    def _make_not(self, left: Node, right: Node) -> Node:
+        return And.of(left, Not(right))
+
+    def _make_or(self, left: Node, right: Node) -> Node:
+        return Or.of(left, right)
+
+    def _make_condition(self, fields: List[str], op: str, value: str) -> Node:
+        if op == '=':
+            return Term(value, fields, exact=len(fields) == 1)
+
+        try:
+            value = int(value)
+        except ValueError:
+            pass
+        if op == '>':
+            return Range(fields[0], gt=value)
+        return Range(fields[0], lt=value)
+
+
+def parse_ast(query_string: str) -> Node:
+    return AstSearchParser(query_string).parse()
+
+
+def render(query_string: str, backend: str = 'es', default_fields: Optional[List[str]] = None):
+    """ 解析一次，输出为 es（DSL 字典）、json（紧凑 JSON 字符串）或 sql（(where, params)）
+    """
+    node = parse_ast(query_string)
+    if backend == 'es':
+        return EsBackend(default_fields).to_dsl(node)
+    if backend == 'json':
+        return JsonBackend(default_fields).dumps(node)
+    if backend == 'sql':
+        return SqlBackend(default_fields).to_sql(node)
+    raise ValueError(f"Unknown backend: {backend}")
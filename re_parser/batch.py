@@ -0,0 +1,61 @@
+"""批量把查询编译为 DSL：JSONL 输入，JSONL 输出
+
+    python batch.py queries.jsonl -o dsl.jsonl --workers 8
+
+输入每行是 {"id": ..., "query": "..."} 或一个 JSON 字符串，缺少 id 时使用行号；
+输出每行是 {"id": ..., "dsl": {...}}，解析失败时为 {"id": ..., "error": "..."}，不会中断整个批次。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import sys
+
+# JSONL 读写与调度和 expr2dsl 共用 expr2dsl/python/batch_io.py
+from expr2dsl import batch_io
+from parser import SearchParser
+
+
+def _parse_one(query):
+
+    try:
+        return {"dsl": SearchParser(query).parse()}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _parse_chunk(queries):
+
+    return [_parse_one(query) for query in queries]
+
+
+def parse_many(queries, workers=1, chunk_size=256, window=64):
+    """按输入顺序逐个产出 {"dsl": ...} 或 {"error": ...}"""
+
+    if workers <= 1:
+        for query in queries:
+            yield _parse_one(query)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from batch_io.bounded_map(executor, _parse_chunk, queries, chunk_size, window)
+
+
+def run_batch(lines, output, workers=1):
+
+    return batch_io.run_batch(lines, output, lambda queries: parse_many(queries, workers))
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description="批量把查询编译为 Elasticsearch DSL")
+    arg_parser.add_argument("input", help="JSONL 文件，- 表示标准输入")
+    arg_parser.add_argument("-o", "--output", default="-", help="JSONL 文件，- 表示标准输出")
+    arg_parser.add_argument("--workers", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    with source, target:
+        total, failed = run_batch(source, target, args.workers)
+
+    print(f"done: {total} queries, {failed} failed", file=sys.stderr)
@@ -0,0 +1,122 @@
+import argparse
+import random
+import sys
+import time
+from typing import Callable, List
+
+from ast_parser import parse_ast
+from expr2dsl.query_cache import QueryCache
+from fuzz import random_query
+from legacy import LegacySearchParser
+from parser import SearchParser, parse_query
+
+
+def make_query(terms: int, seed: int = 0) -> str:
+    """ 生成由 and/or/not 连接、带括号分组的长查询
+    """
+    rng = random.Random(seed)
+    parts = []
+    for i in range(terms):
+        if i:
+            parts.append(rng.choice(['and', 'or', 'not', 'AND', 'OR']))
+        kind = rng.random()
+        if kind < 0.6:
+            parts.append(f"field{rng.randint(0, 50)}=value{rng.randint(0, 10000)}")
+        elif kind < 0.8:
+            parts.append(f"ti,abst,claim=word{rng.randint(0, 10000)}")
+        else:
+            parts.append(f"(date>{rng.randint(1990, 2025)} or date<{rng.randint(1990, 2025)})")
+    return " ".join(parts)
+
+
+def best_time(parser_class, query: str, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parser_class(query).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def latencies(parse: Callable[[str], object], queries: List[str]) -> List[float]:
+    """ 逐个查询计时，返回升序的耗时列表（秒）
+    """
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        parse(query)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def percentile(times: List[float], q: float) -> float:
+    return times[min(len(times) - 1, int(q * len(times)))]
+
+
+def long_suite(args):
+    print(f"{'terms':>6} {'KB':>8} {'legacy ms':>10} {'token ms':>10} {'speedup':>8}")
+    for terms in args.terms:
+        query = make_query(terms)
+        if SearchParser(query).parse() != LegacySearchParser(query).parse():
+            raise SystemExit(f"parsers disagree on a query of {terms} terms")
+        legacy = best_time(LegacySearchParser, query, args.rounds)
+        token = best_time(SearchParser, query, args.rounds)
+        print(f"{terms:>6} {len(query) / 1024:>8.1f} {legacy * 1000:>10.2f} "
+              f"{token * 1000:>10.2f} {legacy / token:>7.1f}x")
+
+
+def throughput_suite(args):
+    """ fuzz.py 生成的随机查询；每种形态下各条路径的 qps 与 p50 / p99 延迟
+    token 与缓存路径先确认与原来的解析器结果相同（语义上的交叉检查见 fuzz.py）
+    """
+    cache = QueryCache(maxsize=2 * args.queries)
+    paths = {
+        'legacy': lambda q: LegacySearchParser(q).parse(),
+        'token': lambda q: SearchParser(q).parse(),
+        'ast': parse_ast,
+        'cached': lambda q: parse_query(q, cache),
+    }
+
+    print(f"{'depth':>5} {'width':>5} {'path':>8} {'qps':>9} {'p50 us':>9} {'p99 us':>9}")
+    for depth in args.fuzz_depths:
+        rng = random.Random(depth)
+        queries = [random_query(rng, depth, args.fuzz_width) for _ in range(args.queries)]
+        for query in queries:
+            expected = LegacySearchParser(query).parse()
+            if paths['token'](query) != expected or paths['cached'](query) != expected:
+                raise SystemExit(f"parsers disagree: {query}")
+
+        for name, parse in paths.items():
+            times = latencies(parse, queries)
+            print(f"{depth:>5} {args.fuzz_width:>5} {name:>8} {len(times) / sum(times):>9.0f} "
+                  f"{percentile(times, 0.5) * 1e6:>9.1f} {percentile(times, 0.99) * 1e6:>9.1f}")
+
+
+SUITES = {
+    'long': long_suite,
+    'throughput': throughput_suite,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SearchParser 的性能测试")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    # long：长查询上对比切片解析器与 token 解析器
+    parser.add_argument('--terms', type=int, nargs='+', default=[10, 100, 1000, 4000])
+    parser.add_argument('--rounds', type=int, default=5)
+    # throughput：随机查询的吞吐与延迟（缓存路径测的是命中后的耗时）
+    parser.add_argument('--fuzz-depths', type=int, nargs='+', default=[2, 4, 6])
+    parser.add_argument('--fuzz-width', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+    # 结果是左深的嵌套 dict，比较时递归层数与查询长度成正比
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(args.terms)))
+
+    for i, suite in enumerate(args.suites):
+        if i:
+            print()
+        SUITES[suite](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+""" 与 expr2dsl 共用的模块（query_cache、query_ast、batch_io、evaluator）
+
+本模块把 expr2dsl/python 作为包 expr2dsl 的路径，共用模块以带包名的方式导入，如
+from expr2dsl.query_ast import EsBackend。不修改 sys.path，因此两个项目中同名的
+batch、benchmark、fuzz、legacy 不会互相遮蔽。
+"""
+import os
+
+__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'expr2dsl', 'python')]
@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from ast_parser import parse_ast
+from expr2dsl.evaluator import compile_predicate, dsl_predicate
+from expr2dsl.query_ast import EsBackend
+from expr2dsl.query_cache import QueryCache
+from legacy import LegacySearchParser
+from parser import SearchParser, parse_query
+
+WORDS = ['car', 'bus', 'engine', 'battery', 'korea', 'japan']
+
+
+def random_leaf(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.5:
+        return f"field{rng.randint(0, 3)}=v{rng.randint(0, 4)}"
+    if kind < 0.75:
+        return f"ti,abst={rng.choice(WORDS)}"
+    return f"date{rng.choice('<>')}{rng.randint(1995, 2025)}"
+
+
+def random_query(rng: random.Random, depth: int, width: int) -> str:
+    """ 最多嵌套 depth 层括号，每层最多 width 个条件，关键字大小写随机
+    """
+    if depth == 0 or rng.random() < 0.2:
+        return random_leaf(rng)
+    parts = [random_query(rng, depth - 1, width) for _ in range(rng.randint(2, width))]
+    query = parts[0]
+    for part in parts[1:]:
+        op = rng.choice(['and', 'or', 'not'])
+        query += f" {op.upper() if rng.random() < 0.3 else op} {part}"
+    return f"({query})"
+
+
+def corpus(count: int, depth: int, width: int, seed: int = 0) -> Iterator[str]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield random_query(rng, depth, width)
+
+
+def random_document(rng: random.Random) -> Dict[str, object]:
+    doc: Dict[str, object] = {f"field{i}": f"v{rng.randint(0, 4)}" for i in range(4)}
+    doc['ti'] = " ".join(rng.choices(WORDS, k=3))
+    doc['abst'] = " ".join(rng.choices(WORDS, k=6))
+    doc['date'] = rng.randint(1995, 2025)
+    return doc
+
+
+def cross_check(queries: Iterator[str], docs: List[Dict[str, object]]) -> List[Tuple[str, str]]:
+    """ 返回不一致的 (查询, 说明) 列表：
+    SearchParser 与原来的切片解析器、带缓存的 parse_query 得到完全相同的 DSL；
+    AST 渲染的 DSL 与 AST 谓词在随机文档上与 SearchParser 的 DSL 匹配相同的文档
+    """
+    cache = QueryCache()
+    failures = []
+    for query in queries:
+        expected = SearchParser(query).parse()
+        if LegacySearchParser(query).parse() != expected:
+            failures.append((query, 'legacy parser'))
+        if parse_query(query, cache) != expected or parse_query(query, cache) != expected:
+            failures.append((query, 'cache'))
+
+        matches = [i for i, doc in enumerate(docs) if dsl_predicate(expected)(doc)]
+        node = parse_ast(query)
+        rendered = dsl_predicate(EsBackend().to_dsl(node))
+        if [i for i, doc in enumerate(docs) if rendered(doc)] != matches:
+            failures.append((query, 'AST + EsBackend'))
+        predicate = compile_predicate(node)
+        if [i for i, doc in enumerate(docs) if predicate(doc)] != matches:
+            failures.append((query, 'AST predicate'))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="随机查询的交叉检查")
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--width', type=int, default=4)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--write', metavar='JSONL', help="只写出语料（可交给 batch.py），不做检查")
+    args = parser.parse_args()
+
+    queries = corpus(args.count, args.depth, args.width, args.seed)
+
+    if args.write:
+        with open(args.write, 'w', encoding='utf-8') as f:
+            for i, query in enumerate(queries):
+                f.write(json.dumps({"id": i, "query": query}) + "\n")
+        return
+
+    rng = random.Random(args.seed)
+    docs = [random_document(rng) for _ in range(args.docs)]
+    failures = cross_check(queries, docs)
+    for query, check in failures[:20]:
+        print(f"{check}: {query}")
+    print(f"{args.count} queries, {len(failures)} mismatches")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
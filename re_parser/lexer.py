@@ -0,0 +1,44 @@
+from typing import Iterator, NamedTuple, Optional, Tuple
+import re
+
+
+class Token(NamedTuple):
+    type: str  # LPAREN RPAREN AND OR NOT COND INVALID EOF
+    value: Optional[Tuple[str, str, str]]  # COND 为 (field, op, value)
+    pos: int
+
+
+# 所有 token 合并为一个预编译的正则，用 pattern.match(query, pos) 从当前位置匹配，
+# 不再对剩余查询串切片
+TOKEN_PATTERN = re.compile(r'''
+      (?P<LPAREN>\()
+    | (?P<RPAREN>\))
+    | (?P<KEYWORD>(?i:and|or|not))(?=[\s()]|$)
+    | (?P<COND>(?P<FIELD>[^=<>]+)(?P<OP>[=<>])(?P<VALUE>[^=<>\s)]+))
+''', re.VERBOSE)
+
+WHITESPACE = re.compile(r'\s*')
+
+
+def tokenize(query: str) -> Iterator[Token]:
+    """ 惰性地产生 token，解析器停止时后面的内容不会被扫描
+    关键字必须以空白、括号或结尾分隔，因此 android=1 是字段条件而不是 and
+    无法识别的内容产生 INVALID，由解析器根据所处位置决定是否报错
+    """
+    end = len(query)
+    pos = WHITESPACE.match(query).end()
+    while pos < end:
+        match = TOKEN_PATTERN.match(query, pos)
+        if match is None:
+            while True:
+                yield Token('INVALID', None, pos)
+        kind = match.lastgroup
+        if kind == 'KEYWORD':
+            yield Token(match.group(kind).upper(), None, pos)
+        elif kind == 'COND':
+            yield Token(kind, match.group('FIELD', 'OP', 'VALUE'), pos)
+        else:
+            yield Token(kind, None, pos)
+        pos = WHITESPACE.match(query, match.end()).end()
+    while True:
+        yield Token('EOF', None, end)
@@ -1,143 +1,159 @@
-from typing import Dict, Any
-import re
+from typing import Dict, Any, List, Optional
+
+from expr2dsl.query_cache import QueryCache
+from lexer import Token, tokenize
 
 class SearchParser:
     def __init__(self, query_string: str):
         self.query = query_string.strip()
         self.pos = 0
         self.parentheses_count = 0  # 添加括号计数器
-        
+        self.tokens = tokenize(self.query)
+        self.current: Token = next(self.tokens)
+
     def parse(self) -> Dict[str, Any]:
         result = self._parse_expression()
         # 检查是否所有括号都已匹配
         if self.parentheses_count > 0:
             raise ValueError("Unmatched opening parenthesis")
+        self._expect_end()
         return {"query": result}
-    
+
+    def _expect_end(self) -> None:
+        """ 顶层表达式之后必须是输入结尾，多余的内容（a=1 b=2、a=1)）报错而不是被丢弃
+        """
+        token = self.current
+        if token.type == 'RPAREN':
+            raise ValueError(f"Unmatched closing parenthesis at position {token.pos}")
+        if token.type != 'EOF':
+            raise ValueError(f"Unexpected '{self.query[token.pos]}' at position {token.pos}")
+
+    def _advance(self) -> Token:
+        """ 取出当前 token 并读入下一个，每个 token 只被词法分析一次
+        """
+        token = self.current
+        self.pos = token.pos
+        self.current = next(self.tokens)
+        return token
+
     def _parse_expression(self) -> Dict[str, Any]:
         """ 解析表达式，处理逻辑运算符 not and or
         """
         left = self._parse_term()
-        
-        while self.pos < len(self.query):
-            self._skip_whitespace()
-            if self.pos >= len(self.query):
-                break
-                
-            if self._peek().lower() == 'and':
-                self._consume('and')
-                right = self._parse_term()
-                left = {
-                    "bool": {
-                        "must": [left, right]
-                    }
-                }
-            elif self._peek().lower() == 'not':
-                self._consume('not')
-                right = self._parse_term()
-                left = {
-                    "bool": {
-                        "must": [left],
-                        "must_not": [right]
-                    }
-                }
-            elif self._peek().lower() == 'or':
-                self._consume('or')
-                right = self._parse_term()
-                left = {
-                    "bool": {
-                        "should": [left, right]
-                    }
-                }
+
+        while True:
+            op = self.current.type
+            if op == 'AND':
+                self._advance()
+                left = self._make_and(left, self._parse_term())
+            elif op == 'NOT':
+                self._advance()
+                left = self._make_not(left, self._parse_term())
+            elif op == 'OR':
+                self._advance()
+                left = self._make_or(left, self._parse_term())
             else:
                 break
-                
+
         return left
-    
+
     def _parse_term(self) -> Dict[str, Any]:
         """ 解析单个条件，包括字段比较和括号内的子表达式 > < =
         """
-        self._skip_whitespace()
-        
-        if self.pos >= len(self.query):
+        token = self.current
+
+        if token.type == 'EOF':
+            self.pos = token.pos
             if self.parentheses_count > 0:
                 raise ValueError(f"Unclosed parenthesis: missing {self.parentheses_count} closing parenthesis")
             raise ValueError("Unexpected end of input")
-            
-        if self.query[self.pos] == '(':
+
+        if token.type == 'LPAREN':
             self.parentheses_count += 1
-            self.pos += 1  # consume '('
+            self._advance()  # consume '('
             result = self._parse_expression()
-            self._skip_whitespace()
-            
-            if self.pos >= len(self.query):
-                raise ValueError(f"Unclosed parenthesis: missing closing parenthesis at position {self.pos}")
-            
-            if self.query[self.pos] != ')':
-                raise ValueError(f"Expected closing parenthesis at position {self.pos}, found '{self.query[self.pos]}'")
-                
+            token = self.current
+
+            if token.type == 'EOF':
+                raise ValueError(f"Unclosed parenthesis: missing closing parenthesis at position {token.pos}")
+
+            if token.type != 'RPAREN':
+                raise ValueError(f"Expected closing parenthesis at position {token.pos}, found '{self.query[token.pos]}'")
+
             self.parentheses_count -= 1
-            self.pos += 1  # consume ')'
+            self._advance()  # consume ')'
             return result
-            
+
         # Parse field conditions like "field=value" or "field>value"
-        match = re.match(r'([^=<>]+)(=|>|<)([^=<>\s\)]+)', self.query[self.pos:])
-        if match:
-            field, op, value = match.groups()
-            self.pos += len(match.group())
-            
+        if token.type == 'COND':
+            self._advance()
+            field, op, value = token.value
+
             # Handle multiple fields with comma
             fields = [f.strip() for f in field.split(',')]
-            
-            if op == '=':
-                if len(fields) == 1:
-                    return {
-                        "term": {
-                            fields[0]: value
-                        }
-                    }
-                else:
-                    return {
-                        "bool": {
-                            "should": [
-                                {"match": {f: value}} for f in fields
-                            ]
-                        }
+            return self._make_condition(fields, op, value)
+
+        raise ValueError(f"Invalid syntax at position {token.pos}")
+
+    # -------- 构造结果节点，AstSearchParser 覆盖这些方法以生成 query_ast 节点 --------
+
+    def _make_and(self, left: Any, right: Any) -> Any:
+        return {
+            "bool": {
+                "must": [left, right]
+            }
+        }
+
+    def _make_not(self, left: Any, right: Any) -> Any:
+        return {
+            "bool": {
+                "must": [left],
+                "must_not": [right]
+            }
+        }
+
+    def _make_or(self, left: Any, right: Any) -> Any:
+        return {
+            "bool": {
+                "should": [left, right]
+            }
+        }
+
+    def _make_condition(self, fields: List[str], op: str, value: str) -> Any:
+        if op == '=':
+            if len(fields) == 1:
+                return {
+                    "term": {
+                        fields[0]: value
                     }
-            elif op in ['>', '<']:
-                range_op = 'gt' if op == '>' else 'lt'
-                try:
-                    value = int(value)
-                except ValueError:
-                    pass
-                
+                }
+            else:
                 return {
-                    "range": {
-                        fields[0]: {
-                            range_op: value
-                        }
+                    "bool": {
+                        "should": [
+                            {"match": {f: value}} for f in fields
+                        ]
                     }
                 }
-                
-        raise ValueError(f"Invalid syntax at position {self.pos}")
-    
-    def _peek(self) -> str:
-        self._skip_whitespace()
-        if self.pos >= len(self.query):
-            return ''
-        
-        # Look ahead for keywords
-        for keyword in ['and', 'or', 'not']:
-            if self.query[self.pos:].lower().startswith(keyword):
-                return keyword
-        return self.query[self.pos]
-    
-    def _consume(self, expected: str):
-        self._skip_whitespace()
-        if not self.query[self.pos:].lower().startswith(expected.lower()):
-            raise ValueError(f"Expected '{expected}' at position {self.pos}")
-        self.pos += len(expected)
-    
-    def _skip_whitespace(self):
-        while self.pos < len(self.query) and self.query[self.pos].isspace():
-            self.pos += 1 
\ No newline at end of file
+
+        range_op = 'gt' if op == '>' else 'lt'
+        try:
+            value = int(value)
+        except ValueError:
+            pass
+
+        return {
+            "range": {
+                fields[0]: {
+                    range_op: value
+                }
+            }
+        }
+
+
+def parse_query(query_string: str, cache: Optional[QueryCache] = None) -> Dict[str, Any]:
+    """ 解析查询串；传入 QueryCache 时，相同的查询（忽略首尾空白）只解析一次
+    """
+    if cache is None:
+        return SearchParser(query_string).parse()
+    return cache.get_or_parse(query_string.strip(), lambda: SearchParser(query_string).parse())